@@ -0,0 +1,241 @@
+import numpy as np
+from event_store import CRIT
+
+
+class Totals:
+    """Mergeable per-entity totals behind a totals-style report.
+
+    Keeps, per entity: total amount, event count, smallest and largest
+    amount, total of critical amounts and a per-ability breakdown. Partial
+    totals (log chunks, a growing log, several logs or nights) combine with
+    merge(), finalize() then picks the report's top entities.
+    """
+
+    def __init__(self):
+        self.stats = {}      # {key: {'total', 'count', 'min', 'max', 'crit'}}, in order of first occurrence
+        self.abilities = {}  # {key: {ability: total}}
+
+    def __len__(self):
+        return len(self.stats)
+
+    @classmethod
+    def from_events(cls, log, key_column, mask):
+        """Totals of the masked rows of an EventStore, grouped by a name column."""
+        totals = cls()
+        keys = key_column[mask]
+        if not len(keys):
+            return totals
+
+        amounts = log.amount[mask]
+        unique_keys, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        size = len(unique_keys)
+        sums = np.bincount(inverse, weights=amounts, minlength=size)
+        counts = np.bincount(inverse, minlength=size)
+        crit_sums = np.bincount(inverse, weights=np.where(log.flags[mask] & CRIT, amounts, 0), minlength=size)
+        mins = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+        maxs = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(mins, inverse, amounts)
+        np.maximum.at(maxs, inverse, amounts)
+
+        # Per ability sums, grouped on (key index, ability id) pairs
+        num_names = len(log.names)
+        pairs, pair_inverse = np.unique(inverse.astype(np.int64) * num_names + log.ability[mask], return_inverse=True)
+        pair_sums = np.bincount(pair_inverse, weights=amounts, minlength=len(pairs))
+
+        names = log.names
+        for i in np.argsort(first_seen, kind='stable'):
+            key = names[unique_keys[i]]
+            totals.stats[key] = {
+                'total': int(sums[i]), 'count': int(counts[i]), 'min': int(mins[i]), 'max': int(maxs[i]),
+                'crit': int(crit_sums[i])
+            }
+            totals.abilities[key] = {}
+        for pair, total in zip(pairs.tolist(), pair_sums.tolist()):
+            i, ability = divmod(pair, num_names)
+            totals.abilities[names[unique_keys[i]]][names[ability]] = int(total)
+        return totals
+
+    def add(self, key, amount, ability='', crit=False):
+        """Count a single event."""
+        stats = self.stats.get(key)
+        if stats is None:
+            self.stats[key] = {'total': amount, 'count': 1, 'min': amount, 'max': amount, 'crit': amount if crit else 0}
+            self.abilities[key] = {ability: amount}
+            return
+        stats['total'] += amount
+        stats['count'] += 1
+        stats['min'] = min(stats['min'], amount)
+        stats['max'] = max(stats['max'], amount)
+        if crit:
+            stats['crit'] += amount
+        breakdown = self.abilities[key]
+        breakdown[ability] = breakdown.get(ability, 0) + amount
+
+    def merge(self, other):
+        """Add another Totals into this one, returns self."""
+        for key, other_stats in other.stats.items():
+            stats = self.stats.get(key)
+            if stats is None:
+                self.stats[key] = dict(other_stats)
+                self.abilities[key] = dict(other.abilities[key])
+                continue
+            stats['total'] += other_stats['total']
+            stats['count'] += other_stats['count']
+            stats['min'] = min(stats['min'], other_stats['min'])
+            stats['max'] = max(stats['max'], other_stats['max'])
+            stats['crit'] += other_stats['crit']
+            breakdown = self.abilities[key]
+            for ability, total in other.abilities[key].items():
+                breakdown[ability] = breakdown.get(ability, 0) + total
+        return self
+
+    def finalize(self, top_x, ascending=False):
+        """{key: total} of the top_x entities with the highest totals.
+
+        Sorted highest first, or lowest first with ascending (as the
+        horizontal bar charts draw bottom up). Ties keep first occurrence order.
+        """
+        totals = [(key, stats['total']) for key, stats in self.stats.items()]
+        if ascending:
+            return dict(sorted(totals, key=lambda x: x[1])[-top_x:])
+        return dict(sorted(totals, key=lambda x: x[1], reverse=True)[:top_x])
+
+
+class RunningStats:
+    """Streaming count, total, min, max, mean and variance of a series of amounts.
+
+    Amounts are not kept: add() updates the moments with Welford's method and
+    merge() combines two partial results exactly, so per-entity stats take
+    constant memory however long the log is. With sample_size, a uniform
+    random sample of at most that many amounts is kept for distribution views.
+    """
+
+    __slots__ = ('count', 'total', 'min', 'max', 'mean', 'm2', 'sample_size', '_priorities', '_sample', '_kept', '_worst')
+
+    def __init__(self, sample_size=0):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.sample_size = sample_size
+        # Bottom-k sample: the amounts with the smallest random priorities, mergeable across partial results.
+        # Preallocated, add() fills the free slots and then replaces the slot with the largest priority.
+        self._priorities = np.empty(sample_size)
+        self._sample = np.empty(sample_size, dtype=np.int64)
+        self._kept = 0
+        self._worst = 0  # slot of the largest kept priority, once all slots are used
+
+    @property
+    def priorities(self):
+        return self._priorities[:self._kept]
+
+    @property
+    def sample(self):
+        """The sampled amounts, at most sample_size of them."""
+        return self._sample[:self._kept]
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+    def add(self, amount):
+        """Count a single amount."""
+        self.count += 1
+        self.total += amount
+        self.min = amount if self.min is None else min(self.min, amount)
+        self.max = amount if self.max is None else max(self.max, amount)
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        if self.sample_size:
+            self._add_sample(np.random.random(), amount)
+
+    def merge(self, other):
+        """Add another RunningStats into this one, returns self."""
+        if not other.count:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+        if self.sample_size:
+            self._keep_sample(np.concatenate([self.priorities, other.priorities]),
+                              np.concatenate([self.sample, other.sample]))
+        return self
+
+    def _add_sample(self, priority, amount):
+        if self._kept < self.sample_size:
+            slot = self._kept
+            self._kept += 1
+        elif priority < self._priorities[self._worst]:
+            slot = self._worst
+        else:
+            return
+        self._priorities[slot] = priority
+        self._sample[slot] = amount
+        if self._kept == self.sample_size:
+            self._worst = int(np.argmax(self._priorities))
+
+    def _keep_sample(self, priorities, sample):
+        if len(priorities) > self.sample_size:
+            keep = np.argpartition(priorities, self.sample_size)[:self.sample_size]
+            priorities, sample = priorities[keep], sample[keep]
+        kept = len(priorities)
+        self._priorities[:kept] = priorities
+        self._sample[:kept] = sample
+        self._kept = kept
+        if kept == self.sample_size:
+            self._worst = int(np.argmax(self._priorities))
+
+    @classmethod
+    def from_events(cls, log, key_column, mask, sample_size=0):
+        """{name: RunningStats} of the masked rows' amounts grouped by a name column.
+
+        In order of each name's first masked occurrence. Computed on the
+        columns in one pass per statistic, no per-event Python objects.
+        """
+        keys = key_column[mask]
+        if not len(keys):
+            return {}
+
+        amounts = log.amount[mask]
+        unique_keys, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        size = len(unique_keys)
+        counts = np.bincount(inverse, minlength=size)
+        sums = np.bincount(inverse, weights=amounts, minlength=size)
+        means = sums / counts
+        m2s = np.bincount(inverse, weights=(amounts - means[inverse]) ** 2, minlength=size)
+        mins = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+        maxs = np.full(size, np.iinfo(np.int64).min, dtype=np.int64)
+        np.minimum.at(mins, inverse, amounts)
+        np.maximum.at(maxs, inverse, amounts)
+        if sample_size:
+            priorities = np.random.random(len(amounts))
+            by_group = np.lexsort((priorities, inverse))
+            group_starts = np.searchsorted(inverse[by_group], np.arange(size))
+
+        names = log.names
+        result = {}
+        for i in np.argsort(first_seen, kind='stable').tolist():
+            stats = cls(sample_size)
+            stats.count = int(counts[i])
+            stats.total = int(sums[i])
+            stats.min = int(mins[i])
+            stats.max = int(maxs[i])
+            stats.mean = float(means[i])
+            stats.m2 = float(m2s[i])
+            if sample_size:
+                rows = by_group[group_starts[i]:group_starts[i] + min(sample_size, stats.count)]
+                stats._keep_sample(priorities[rows], amounts[rows])
+            result[names[unique_keys[i]]] = stats
+        return result
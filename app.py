@@ -1,5 +1,7 @@
 import streamlit as st
+import io
 import os
+import time
 import matplotlib.pyplot as plt
 from dotenv import load_dotenv
 import pandas as pd
@@ -18,14 +20,18 @@ from damage_taken_log import DmgRecLog
 from damage_taken_target import DmgTakenByPlayer
 from healing_pots import PotsLog
 from mend import parse_heal_log, calculate_heal_stats, plot_total_heals, plot_min_max_avg_heals, plot_mend_casts
-from ghosts import GhostAnalyzer
-from song_buff import plot_song_buff_data
-from song_debuffs import plot_song_debuff_data
+from ghosts import GhostAnalyzer, ghost_events
+from song_buff import plot_song_buff_data, plot_buff_timeline
+from song_debuffs import plot_song_debuff_data, plot_debuff_timeline
 from damage_taken_from import DmgTakenFromLog
 from healing_taken_from import HealTakenFromLog
 from combo_tracker import ComboTracker, plot_combo_results
 from cast_tracker import CastTracker, CAST_PATTERNS, plot_cast_results
 from combined_analysis import generate_combined_analysis
+from log_cache import ParsedLogCache, DEFAULT_BUDGET_MB, DEFAULT_DISK_BUDGET_MB
+from live_report import LiveReport
+from encounters import encounter_index
+from log_parser import to_epoch
 
 # Add this helper function at the top of the file with other imports
 def plot_data(ax, data, title, color):
@@ -39,6 +45,66 @@ def plot_data(ax, data, title, color):
     xticks = ax.get_xticks()
     ax.set_xticklabels(['{:,.0f}'.format(x) for x in xticks])
 
+@st.cache_resource
+def get_log_cache():
+    # Shared by all sessions, so the same log uploaded twice is parsed once
+    budget_mb = int(os.getenv('LOG_CACHE_MB', DEFAULT_BUDGET_MB))
+    # Parsed events are also kept on disk, so returning to a log skips the parse
+    sidecar_dir = os.getenv('PARSED_LOG_DIR', 'parsed_logs')
+    disk_budget_mb = int(os.getenv('PARSED_LOG_DIR_MB', DEFAULT_DISK_BUDGET_MB))
+    # Large uploads are parsed on all cores
+    workers = int(os.getenv('LOG_PARSE_WORKERS', os.cpu_count() or 1))
+    return ParsedLogCache(max_bytes=budget_mb * 1024 * 1024, sidecar_dir=sidecar_dir, workers=workers,
+                          max_disk_bytes=disk_budget_mb * 1024 * 1024)
+
+def show_live_tail(log_path, includePvE, includeSelf, refresh_seconds):
+    # Follow a log on this machine's disk while the game is still writing it
+    if not os.path.isfile(log_path):
+        st.error(f"Log file not found: {log_path}")
+        return
+
+    # Keep the running report between reruns, start over when the log or options change
+    key = (log_path, includePvE, includeSelf)
+    if st.session_state.get('live_key') != key:
+        st.session_state.live_key = key
+        st.session_state.live_report = LiveReport(log_path, includePvE, includeSelf)
+    report = st.session_state.live_report
+
+    # Only the lines appended since the last refresh are parsed
+    new_events = report.update()
+    st.header(f"Live: {os.path.basename(log_path)}")
+    st.caption(f"{report.num_events:,} events, {new_events:,} new, refreshing every {refresh_seconds}s")
+
+    fig, axes = plt.subplots(1, 3, figsize=(30, 10))
+    plot_data(axes[0], report.damage.finalize(25, ascending=True), 'Damage', 'red')
+    plot_data(axes[1], report.healing.finalize(20, ascending=True), 'Healing', 'green')
+    plot_data(axes[2], report.mend.finalize(20, ascending=True), 'Mend Healing', 'lightgreen')
+    st.pyplot(fig)
+    plt.close(fig)
+
+    col1, col2 = st.columns(2)
+    for col, title, combo_data, color in [
+        (col1, "Distress Combo", report.combos.track_distress_combo(), 'blue'),
+        (col2, "Discord Combo", report.combos.track_discord_combo(), 'purple')
+    ]:
+        with col:
+            st.subheader(title)
+            fig = plot_combo_results(combo_data, f"{title} Successes", color=color)
+            if fig:
+                st.pyplot(fig)
+                plt.close(fig)
+            else:
+                st.info("No combos yet")
+
+    ghost_result = report.ghosts.report()
+    if ghost_result['success']:
+        st.subheader("Ghost Waves")
+        st.metric("Boss Power", f"{ghost_result['boss_power']}%")
+        st.dataframe(ghost_result['wave_summary'])
+
+    time.sleep(refresh_seconds)
+    st.rerun()
+
 # Set page config to wide mode
 st.set_page_config(layout="wide")
 
@@ -86,8 +152,18 @@ else:
     # Sidebar
     st.sidebar.title("Controls")
 
+    # Live mode follows a log on disk instead of an upload
+    live_tail = st.sidebar.checkbox("Live tail a log file")
+    if live_tail:
+        live_path = st.sidebar.text_input("Log file path")
+        refresh_seconds = st.sidebar.number_input("Refresh every (seconds)", min_value=2, max_value=60, value=5)
+        live_PvE = st.sidebar.checkbox("Include PvE", key='live_pve')
+        live_Self = st.sidebar.checkbox("Include Self", key='live_self')
+        if live_path:
+            show_live_tail(live_path, live_PvE, live_Self, refresh_seconds)
+
     # Single file uploader
-    uploaded_file = st.sidebar.file_uploader("Choose a log file", type=['log'])
+    uploaded_file = None if live_tail else st.sidebar.file_uploader("Choose a log file", type=['log'])
 
     if uploaded_file is not None:
         # Read file content directly into memory
@@ -122,13 +198,45 @@ else:
         includePvE = st.sidebar.checkbox("Include PvE")
         includeSelf = st.sidebar.checkbox("Include Self")
 
+        # Restrict the analysis to one encounter (a boss pull or a trash fight)
+        encounter = None
+        if st.sidebar.checkbox("Single encounter"):
+            with st.spinner('Parsing log...'):
+                index = encounter_index(get_log_cache().get(file_content, uploaded_file.name))
+            if len(index):
+                encounter = st.sidebar.selectbox("Encounter", range(len(index)), format_func=index.label)
+            else:
+                st.sidebar.info("No encounters found")
+
+        # Restrict the analysis to a time window, e.g. the last minutes of a long log
+        time_window = None
+        if st.sidebar.checkbox("Time window"):
+            window_start = st.sidebar.text_input("From (YYYY-MM-DD HH:MM:SS)")
+            window_end = st.sidebar.text_input("Until (YYYY-MM-DD HH:MM:SS)")
+            try:
+                time_window = (to_epoch(window_start.strip() or None), to_epoch(window_end.strip() or None))
+            except ValueError:
+                st.sidebar.error("Times must look like 2024-05-01 20:00:00")
+                # Don't fall back to the whole log when a window was asked for
+                st.stop()
+
         # Generate button
         if st.sidebar.button("Generate Plot"):
-            # Save uploaded file to a temporary file in the current directory
-            with open("temp.log", "wb") as f:
-                f.write(file_content)
-            
-            temp_path = "temp.log"
+            # Parsed logs are cached by content, so switching analyses or options
+            # only re-aggregates the already parsed events. The Ghosts view streams
+            # the upload itself and needs no parsed events.
+            restricted = encounter is not None or time_window is not None
+            if analysis_type != "Ghosts" or restricted:
+                with st.spinner('Parsing log...'):
+                    log = get_log_cache().get(file_content, uploaded_file.name)
+                if encounter is not None:
+                    # A slice of the parsed columns, every analysis then only sees this encounter
+                    log = encounter_index(log).log_for(encounter)
+                if time_window is not None:
+                    log = log.time_slice(*time_window)
+                if not len(log):
+                    st.info("No events in the selected encounter or time window")
+                    st.stop()
             
             # Clear any existing plots
             plt.clf()
@@ -138,7 +246,7 @@ else:
                 if analysis_type == "All Plots Combined":
                     from combined_plots import generate_all_plots
                     with st.spinner('Generating all plots... This may take a while...'):
-                        fig = generate_all_plots(temp_path, includePvE, includeSelf)
+                        fig = generate_all_plots(log, includePvE, includeSelf)
                         st.pyplot(fig)
                         
                 elif analysis_type == "All Player Plots":
@@ -147,7 +255,7 @@ else:
                     else:
                         from player_plots import generate_player_plots
                         with st.spinner('Generating player plots... This may take a while...'):
-                            fig = generate_player_plots(temp_path, player_name, includePvE, includeSelf)
+                            fig = generate_player_plots(log, player_name, includePvE, includeSelf)
                             st.pyplot(fig)
                 
                 elif analysis_type == "Combined Analysis":
@@ -156,75 +264,82 @@ else:
                     else:    
                         with st.spinner('Processing combined log data...'):
                             try:
-                                fig = generate_combined_analysis(temp_path, includePvE, includeSelf)
+                                fig = generate_combined_analysis(log, includePvE, includeSelf)
                                 st.pyplot(fig)
                             except Exception as e:
                                 st.error(f"Error generating combined analysis: {str(e)}")
                 
                 elif analysis_type == "Damage Log":
-                    dmg_log, plot = DamageLog(temp_path, (0, 24), includePvE)
+                    dmg_log, plot = DamageLog(log, includePvE)
                     st.pyplot(plot)
                 
                 elif analysis_type == "Damage By Ability":
                     if player_name:
-                        dmg_log, plot = DmgAbiLog(temp_path, player_name, includePvE)
+                        dmg_log, plot = DmgAbiLog(log, player_name, includePvE)
                         st.pyplot(plot)
                 
                 elif analysis_type == "Damage Percentile Comparison":
                     if players:
                         excel_filename = os.path.join("output", "damage_percentile.xlsx")
                         graph_filename = os.path.join("output", "damage_percentile.png")
-                        DmgPercentileLog(temp_path, players, includePvE, excel_filename, graph_filename)
+                        DmgPercentileLog(log, players, includePvE, excel_filename, graph_filename)
                         st.image(graph_filename)
                 
                 elif analysis_type == "Healing Log":
-                    heal_log, plot = HealingLog(temp_path, (0, 24), includeSelf)
+                    heal_log, plot = HealingLog(log, includeSelf)
                     st.pyplot(plot)
                 
                 elif analysis_type == "Healing Done By Target":
                     if player_name:
-                        heal_log, plot = HealAbiLog(temp_path, includeSelf, player_name)
+                        heal_log, plot = HealAbiLog(log, includeSelf, player_name)
                         st.pyplot(plot)
                 
                 elif analysis_type == "Healing Received From Healers":
-                    heal_log, plot = HealRecLog(temp_path, "", 25, includeSelf)
+                    heal_log, plot = HealRecLog(log, "", 25, includeSelf)
                     st.pyplot(plot)
                 
                 elif analysis_type == "Healing Taken By Target":
                     if player_name:
-                        heal_log, plot = HealReceivedByPlayer(temp_path, player_name, includePvE)
+                        heal_log, plot = HealReceivedByPlayer(log, player_name, includePvE)
                         st.pyplot(plot)
                 
                 elif analysis_type == "Healing Percentile Comparison":
                     if players:
-                        heal_df = HealPercentileLog(temp_path, players, includeSelf)
+                        heal_df = HealPercentileLog(log, players, includeSelf)
                         if heal_df is not None:
                             st.dataframe(heal_df)
                 
                 elif analysis_type == "Damage Taken Log":
-                    dmg_log, plot = DmgRecLog(temp_path, 25, includePvE)
+                    dmg_log, plot = DmgRecLog(log, 25, includePvE)
                     st.pyplot(plot)
                     
                 elif analysis_type == "Damage Taken By Target":
                     if player_name:
-                        dmg_log, plot = DmgTakenByPlayer(temp_path, player_name, includePvE)
+                        dmg_log, plot = DmgTakenByPlayer(log, player_name, includePvE)
                         st.pyplot(plot)
                 
                 elif analysis_type == "Damage Taken From Who":
                     if player_name:
-                        dmg_log, plot = DmgTakenFromLog(temp_path, player_name, includePvE)
+                        dmg_log, plot = DmgTakenFromLog(log, player_name, includePvE)
                         st.pyplot(plot)
                 
                 elif analysis_type == "Healing From Pots":
-                    pots_log, plot = PotsLog(temp_path, 25)
+                    pots_log, plot = PotsLog(log, 25)
                     st.pyplot(plot)
                 
                 elif analysis_type == "Ghosts":
                     try:
                         analyzer = GhostAnalyzer()
-                        with open(temp_path, 'r', encoding='utf-8') as f:
-                            log_data = f.read()
-                        result = analyzer.analyze_log(log_data)
+                        if restricted:
+                            result = analyzer.analyze_events(ghost_events(log))
+                        else:
+                            # Single pass over the upload, only ghost related lines are parsed
+                            progress_bar = st.progress(0.0, text='Scanning log for ghost mechanics...')
+                            result = analyzer.stream_log_analysis(
+                                io.BytesIO(file_content), chunk_size=100000,
+                                progress=lambda fraction: progress_bar.progress(min(fraction, 1.0))
+                            )
+                            progress_bar.empty()
                         
                         if result['success']:
                             # Summary metrics
@@ -272,7 +387,7 @@ else:
                         st.error(f"Error analyzing ghost data: {str(e)}")
                         
                 elif analysis_type == "Mend":
-                    heal_data, mend_counts = parse_heal_log(temp_path)
+                    heal_data, mend_counts = parse_heal_log(log)
                     heal_stats = calculate_heal_stats(heal_data)
                     fig, axes = plt.subplots(1, 3, figsize=(18, 7.5))
                     plot_total_heals(heal_stats, axes[0])
@@ -282,16 +397,19 @@ else:
                     st.pyplot(fig)
                 
                 elif analysis_type == "Song Buffs":
-                    fig = plot_song_buff_data(temp_path)
+                    fig = plot_song_buff_data(log)
                     st.pyplot(fig)
+                    # When each song was up, to spot the gaps behind the totals
+                    st.pyplot(plot_buff_timeline(log))
                 
                 elif analysis_type == "Song Debuffs":
-                    fig = plot_song_debuff_data(temp_path)
+                    fig = plot_song_debuff_data(log)
                     st.pyplot(fig)
+                    st.pyplot(plot_debuff_timeline(log))
 
                 elif analysis_type == "Healing Taken From Who":
                     if player_name:
-                        heal_log, plot = HealTakenFromLog(temp_path, player_name, includeSelf)
+                        heal_log, plot = HealTakenFromLog(log, player_name, includeSelf)
                         st.pyplot(plot)
 
                 elif analysis_type == "Combos & Casts":
@@ -313,7 +431,7 @@ else:
                         col1, col2 = st.columns(2)
 
                         # Process combos
-                        tracker = ComboTracker(temp_path)
+                        tracker = ComboTracker(log)
                         
                         # Process both columns in fixed-height containers
                         with col1:
@@ -347,7 +465,7 @@ else:
                         cast_container = st.container()
                         with cast_container:
                             with st.spinner('Processing cast data...'):
-                                cast_counter = CastTracker(temp_path)
+                                cast_counter = CastTracker(log)
                                 all_cast_data = cast_counter.track_casts(CAST_PATTERNS)
                                 
                                 if all_cast_data:
@@ -383,6 +501,5 @@ else:
                                         st.info("No cast data found")
             
             finally:
-                # Clean up temporary file
-                if os.path.exists("temp.log"):
-                    os.remove("temp.log")
\ No newline at end of file
+                # Release the figures once they are rendered
+                plt.close('all')
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""Benchmark of the shared line matcher against the old per-module regex loops.
+
+Usage: python benchmark_parser.py [number of lines]
+
+Generates a synthetic combat log (1M lines by default) and times:
+  - the old module loop: pattern.match(line) followed by pattern.findall(line),
+    once for the damage pattern and once for the heal pattern (two reports)
+  - the same two patterns with a single match per line
+  - match_line, which dispatches on the line type's marker before running
+    that type's pattern, classifying every tracked line type at once
+  - the full parse_line (classification, timestamp and Event construction)
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+from log_parser import match_line, parse_line
+
+DMG_PATTERN = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!')
+HEAL_PATTERN = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
+
+PLAYERS = ['Aerith', 'Borin', 'Cyra', 'Dask', 'Elwen', 'Fenn', 'Gorm', 'Hilde', 'Ivo', 'Jarl']
+LINE_TEMPLATES = [
+    (30, '<{ts}|ic23895;{a}|r attacked {b}|r using |cff57d6aeCritical Discord|r|r and caused |cffc13d36-{n}|r|r |cffc13d36Health|r|r (|cffc13d36Critical|r|r)!\n'),
+    (20, '<{ts}|ic23895;{a}|r targeted {b}|r using |cff57d6aeMend|r|r to restore |cff9be85a{n}|r|r health.\n'),
+    (15, '<{ts}|ic23895;{a}|r gained the buff: |cff57d6aeQuickstep (Rank 5)|r|r.\n'),
+    (10, '<{ts}|ic23895;{a}|r was struck by a |cff57d6aeDissonance|r|r debuff!\n'),
+    (5, "<{ts}|ic23895;{a}|r's |cff57d6aeDissonance|r|r debuff cleared.\n"),
+    (10, '<{ts}|ic23895;{a}|r successfully cast |cff57d6aeMocking Howl|r|r!\n'),
+    (10, "<{ts}|ic23895;{a}|r's |cff57d6aeSlash|r|r was dodged by {b}.\n"),
+    (10, '<{ts}|ic23895;{a}|r gained |cff9be85a{n}|r|r experience.\n'),
+]
+
+
+def write_synthetic_log(path, num_lines, seed=1):
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in LINE_TEMPLATES]
+    templates = [template for _, template in LINE_TEMPLATES]
+    second = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for _ in range(num_lines):
+            if rng.random() < 0.3:
+                second += 1
+            ts = f'2024-05-01 {20 + second // 3600 % 4:02d}:{second // 60 % 60:02d}:{second % 60:02d}'
+            template = rng.choices(templates, weights)[0]
+            f.write(template.format(ts=ts, a=rng.choice(PLAYERS), b=rng.choice(PLAYERS), n=rng.randint(1, 5000)))
+
+
+def legacy_match_findall(lines):
+    results = 0
+    for pattern in (DMG_PATTERN, HEAL_PATTERN):
+        for line in lines:
+            if pattern.match(line):
+                result = pattern.findall(line)
+                results += len(result[0])
+    return results
+
+
+def single_match(lines):
+    results = 0
+    for pattern in (DMG_PATTERN, HEAL_PATTERN):
+        for line in lines:
+            if match := pattern.match(line):
+                results += len(match.groups())
+    return results
+
+
+def shared_match(lines):
+    results = 0
+    for line in lines:
+        if match := match_line(line):
+            results += len(match.lastgroup)
+    return results
+
+
+def shared_parse(lines):
+    results = 0
+    for line in lines:
+        if parse_line(line) is not None:
+            results += 1
+    return results
+
+
+def run(num_lines):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'synthetic.log')
+        write_synthetic_log(path, num_lines)
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+
+    print(f"Synthetic log: {num_lines:,} lines")
+    baseline = None
+    for name, func in [
+        ('match + findall (damage, heal)', legacy_match_findall),
+        ('single match (damage, heal)', single_match),
+        ('match_line (all kinds)', shared_match),
+        ('parse_line (all kinds)', shared_parse),
+    ]:
+        start = time.perf_counter()
+        func(lines)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{name:<34} {elapsed:7.2f}s  {num_lines / elapsed / 1e6:5.2f}M lines/s  {baseline / elapsed:5.2f}x")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
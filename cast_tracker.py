@@ -1,65 +1,108 @@
-import re
-from collections import defaultdict
+import numpy as np
 import matplotlib.pyplot as plt
+from log_parser import parse_log, CAST, BUFF
 
+# {tracked name: [(event kind, spell or buff name), ...]}
 CAST_PATTERNS = {
     'Kraken Scepter': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeDesolate Sea Sovereign\|r\|r!',
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeArcadian Sea Sovereign\|r\|r!'
+        (CAST, 'Desolate Sea Sovereign'),
+        (CAST, 'Arcadian Sea Sovereign')
     ],
     'Kraken Shield': [
-        r'<(.+?)\|ic23895;(.+?)\|r gained the buff: \|cff57d6aeArcadian Sea Keeper Stealth\|r\|r\.'
+        (BUFF, 'Arcadian Sea Keeper Stealth')
     ],
     'Startling Strain': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeStartling Strain\|r\|r!'
+        (CAST, 'Startling Strain')
     ],
     'Stillness': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeStillness\|r\|r!'
+        (CAST, 'Stillness')
     ],
     'Bubble Trap': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeBubble Trap\|r\|r!'
+        (CAST, 'Bubble Trap')
     ],
     'Banshee Wail': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeBanshee Wail\|r\|r!'
+        (CAST, 'Banshee Wail')
     ],
     'Halcy Neck': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeDeliverance Shield\|r\|r!'
+        (CAST, 'Deliverance Shield')
     ],
     'Egirl Neck': [
-        r'<(.+?)\|ic23895;(.+?)\|r successfully cast \|cff57d6aeHands of Salvation\|r\|r!'
+        (CAST, 'Hands of Salvation')
     ]
 }
 
+def spell_owners(patterns):
+    """{(event kind, spell): tracked name} of a patterns dict.
+
+    Raises ValueError if a spell is tracked under two names, an event can
+    only be counted for one of them.
+    """
+    owners = {}
+    for ability, spells in patterns.items():
+        for pair in spells:
+            owner = owners.setdefault(pair, ability)
+            if owner != ability:
+                raise ValueError(f"{pair[1]!r} is tracked as both {owner!r} and {ability!r}")
+    return owners
+
 class CastTracker:
-    def __init__(self, logfile):
-        with open(logfile, 'r', encoding='utf-8') as f:
-            self.log_lines = [line for line in f.readlines() 
-                            if "successfully cast" in line or 
-                               "gained the buff: |cff57d6aeArcadian Sea Keeper Stealth" in line]
-        
-        # Precompile patterns
-        self.compiled_patterns = {
-            ability: [re.compile(pattern) for pattern in patterns]
-            for ability, patterns in CAST_PATTERNS.items()
-        }
+    """Counts casts of the tracked abilities per player.
+
+    Spells match the ability name of the log line exactly (case and rank
+    included), e.g. 'Stillness' does not match 'Stillness (Rank 2)'.
+    Every (event kind, spell) pair is mapped to its tracked name through the
+    log's string table, so each event is classified with one array lookup no
+    matter how many patterns are registered.
+    """
+
+    def __init__(self, logfile, patterns=None):
+        self.log = parse_log(logfile)
+        self.patterns = {ability: list(spells) for ability, spells in (patterns or CAST_PATTERNS).items()}
+        spell_owners(self.patterns)
+
+    def register(self, ability, kind, spell):
+        """Track an additional spell (or buff with kind BUFF) under the name ability.
+
+        The spell name must match the log exactly. Raises ValueError if the
+        spell is already tracked under another name.
+        """
+        owner = spell_owners(self.patterns).get((kind, spell))
+        if owner is not None and owner != ability:
+            raise ValueError(f"{spell!r} is already tracked as {owner!r}")
+        if owner is None:
+            self.patterns.setdefault(ability, []).append((kind, spell))
+
+    def track_casts(self, patterns=None):
+        patterns = self.patterns if patterns is None else patterns
+        spell_owners(patterns)
+        log = self.log
+        tracked = list(patterns)
+
+        # Per kind, lookup of ability id -> index of the tracked name (-1 if untracked)
+        lookups = {}
+        for index, ability in enumerate(tracked):
+            for kind, spell in patterns[ability]:
+                spell_id = log.name_id(spell)
+                if spell_id >= 0:
+                    lookup = lookups.setdefault(kind, np.full(len(log.names), -1, dtype=np.int64))
+                    lookup[spell_id] = index
+        if not lookups:
+            return {}
 
-    def track_casts(self, patterns):
-        cast_counts = defaultdict(lambda: defaultdict(int))
-        
-        # Pattern to extract timestamp and player name
-        timestamp_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.*?)\|r')
+        tracked_index = np.full(len(log), -1, dtype=np.int64)
+        for kind, lookup in lookups.items():
+            rows = log.mask(kind)
+            tracked_index[rows] = lookup[log.ability[rows]]
+        rows = tracked_index >= 0
 
-        for line in self.log_lines:
-            # First extract player name without timestamp
-            if timestamp_match := timestamp_pattern.match(line):
-                player = timestamp_match.group(2).strip()
-                
-                # Then check for ability patterns
-                for ability_name, compiled_patterns in self.compiled_patterns.items():
-                    for pattern in compiled_patterns:
-                        if pattern.search(line):
-                            cast_counts[ability_name][player] += 1
-                            break
+        # Count (tracked name, player) pairs, in order of first occurrence
+        pairs, first_seen, counts = np.unique(
+            tracked_index[rows] * len(log.names) + log.actor[rows], return_index=True, return_counts=True
+        )
+        cast_counts = {}
+        for i in np.argsort(first_seen, kind='stable'):
+            index, player = divmod(int(pairs[i]), len(log.names))
+            cast_counts.setdefault(tracked[index], {})[log.names[player]] = int(counts[i])
 
         return {ability: dict(sorted(counts.items(), key=lambda x: x[1], reverse=True)[:10])
                 for ability, counts in cast_counts.items()
@@ -6,6 +6,7 @@ from healing_log import HealingLog
 from damage_taken_log import DmgRecLog
 from healing_received import HealRecLog
 from healing_pots import PotsLog
+from log_parser import parse_log
 
 logger = logging.getLogger(__name__)
 
@@ -29,13 +30,16 @@ def plot_combined_data(ax, data, title, color):
 def generate_combined_analysis(logfile, includePvE, includeSelf):
     """Generate combined analysis plots with proper memory management"""
     try:
+        # Parse the log once, every plot below reuses the same events
+        logfile = parse_log(logfile)
+
         # Create a 3x2 grid for up to 5 plots, leave last axis empty
         fig, axes = plt.subplots(3, 2, figsize=(20, 24))
         axes = axes.flatten()
 
         data_collections = [
-            (lambda: DamageLog(logfile, (0, 24), includePvE)[0], 'Damage', 'red'),
-            (lambda: HealingLog(logfile, (0, 24), includeSelf)[0], 'Healing', 'green'),
+            (lambda: DamageLog(logfile, includePvE)[0], 'Damage', 'red'),
+            (lambda: HealingLog(logfile, includeSelf)[0], 'Healing', 'green'),
             (lambda: DmgRecLog(logfile, 25, includePvE)[0], 'Damage Taken', 'blue'),
             (lambda: HealRecLog(logfile, "", 25, includeSelf)[0], 'Healing Received', 'lightgreen'),
             (lambda: PotsLog(logfile, 25)[0], 'Healing from Pots', 'purple')
@@ -9,15 +9,19 @@ from cast_tracker import CastTracker, plot_cast_results
 from song_buff import plot_song_buff_data
 from song_debuffs import plot_song_debuff_data
 from mend import parse_heal_log, calculate_heal_stats, plot_total_heals, plot_min_max_avg_heals, plot_mend_casts
+from log_parser import parse_log
 
 def generate_all_plots(logfile, includePvE, includeSelf):
+    # Parse the log once, every plot below reuses the same events
+    logfile = parse_log(logfile)
+
     # Create a 4x3 grid of subplots
     fig = plt.figure(figsize=(30, 40))
     
     # General plots
     plots = [
-        (1, "Damage", lambda: DamageLog(logfile, (0, 24), includePvE)[0], 'red'),
-        (2, "Healing", lambda: HealingLog(logfile, (0, 24), includeSelf)[0], 'green'),
+        (1, "Damage", lambda: DamageLog(logfile, includePvE)[0], 'red'),
+        (2, "Healing", lambda: HealingLog(logfile, includeSelf)[0], 'green'),
         (3, "Damage Taken", lambda: DmgRecLog(logfile, 25, includePvE)[0], 'blue'),
         (4, "Healing Received", lambda: HealRecLog(logfile, "", 25, includeSelf)[0], 'lightgreen'),
         (5, "Healing from Pots", lambda: PotsLog(logfile, 25)[0], 'purple')
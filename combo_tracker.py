@@ -1,93 +1,113 @@
-import re
-from datetime import datetime
+import numpy as np
 import matplotlib.pyplot as plt
+from log_parser import parse_log, DAMAGE, ATTACK, BUFF, DEBUFF, CAST
+
+class Combo:
+    """A timed sequence of events that ends in a finishing event.
+
+    Each setup step is (event kinds, ability, window): the last such event on
+    the entity has to be at most window seconds before the finisher. The
+    entity is the setup_key column of the setup events and the finish_key
+    column of the finisher, the player credited is the actor of the setup.
+    With consume, a finisher uses up the setup, so each combo needs a new one.
+    """
+
+    def __init__(self, name, setup, finisher, setup_key='actor', finish_key='actor', consume=True):
+        self.name = name
+        self.setup = [(kinds if isinstance(kinds, tuple) else (kinds,), ability, window)
+                      for kinds, ability, window in setup]
+        kinds, ability = finisher
+        self.finisher = (kinds if isinstance(kinds, tuple) else (kinds,), ability)
+        self.setup_key = setup_key
+        self.finish_key = finish_key
+        self.consume = consume
+
+    def completed(self, state, current_time):
+        # Every setup step happened, each within its window
+        for time, (kinds, ability, window) in zip(state.times, self.setup):
+            if time is None or current_time - time > window:
+                return False
+        return True
+
+class ComboState:
+    # When each setup step last happened (epoch seconds, None if not since the last finisher) and by whom
+    __slots__ = ('times', 'player')
+
+    def __init__(self, steps):
+        self.times = [None] * steps
+        self.player = None
+
+    def clear(self):
+        self.times = [None] * len(self.times)
+
+# Retribution, Toughened and Bull Rush up when casting Mocking Howl
+DISTRESS = Combo('Distress', [
+    (BUFF, 'Retribution', 59),
+    (BUFF, 'Toughened (Rank 4)', 9),
+    (BUFF, 'Bull Rush: Aggro Boost', 5)
+], (CAST, 'Mocking Howl'))
+# Critical Discord hit followed by Dissonance on the target within 3s
+DISCORD = Combo('Discord', [
+    ((DAMAGE, ATTACK), 'Critical Discord', 3)
+], (DEBUFF, 'Dissonance'), setup_key='target', consume=False)
+
+COMBOS = [DISTRESS, DISCORD]
 
 class ComboTracker:
-    def __init__(self, logfile):
-        with open(logfile, 'r', encoding='utf-8') as f:
-            self.log_lines = f.readlines()  # Store as lines instead of full string
-        
-        # Precompile regex patterns
-        self.timestamp_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
-        self.retribution_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r gained the buff: \|cff57d6aeRetribution\|r\|r\.')
-        self.toughen_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r gained the buff: \|cff57d6aeToughened \(Rank 4\)\|r\|r\.')
-        self.bull_rush_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r gained the buff: \|cff57d6aeBull Rush: Aggro Boost\|r\|r\.')
-        self.distress_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r was struck by a \|cff57d6aeDistressed\|r\|r debuff!')
-        self.discord_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6aeCritical Discord\|r\|r')
-        self.dissonance_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r was struck by a \|cff57d6aeDissonance\|r\|r debuff!')
-        self.mocking_howl_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r successfully cast \|cff57d6aeMocking Howl\|r\|r!')
+    def __init__(self, logfile=None, combos=COMBOS):
+        # Combo state is kept between feeds, so a growing log can be fed piece by piece
+        self.combos = list(combos)
+        self.states = {combo.name: {} for combo in self.combos}  # {combo: {entity: ComboState}}
+        self.counts = {combo.name: {} for combo in self.combos}  # {combo: {player: successes}}
+        if logfile is not None:
+            self.feed(parse_log(logfile))
+
+    def feed(self, log):
+        """Evaluate all combos in one pass over the events that take part in any of them."""
+        # {(kind, ability id): [(combo, setup step or None for the finisher)]}
+        triggers = {}
+        for combo in self.combos:
+            steps = [(kinds, ability, step) for step, (kinds, ability, window) in enumerate(combo.setup)]
+            steps.append(combo.finisher + (None,))
+            for kinds, ability, step in steps:
+                ability_id = log.name_id(ability)
+                for kind in kinds:
+                    triggers.setdefault((kind, ability_id), []).append((combo, step))
+
+        rows = log.mask(*{kind for kind, ability in triggers})
+        rows &= np.isin(log.ability, [ability for kind, ability in triggers])
+
+        names = log.names
+        for kind, current_time, actor, target, ability in log.columns(rows, 'kind', 'timestamp', 'actor', 'target', 'ability'):
+            for combo, step in triggers.get((kind, ability), ()):
+                states = self.states[combo.name]
+                if step is not None:
+                    entity = names[actor if combo.setup_key == 'actor' else target]
+                    state = states.get(entity)
+                    if state is None:
+                        state = states[entity] = ComboState(len(combo.setup))
+                    state.times[step] = current_time
+                    state.player = names[actor]
+                    continue
+
+                state = states.get(names[actor if combo.finish_key == 'actor' else target])
+                if state is None:
+                    continue
+                if combo.completed(state, current_time):
+                    counts = self.counts[combo.name]
+                    counts[state.player] = counts.get(state.player, 0) + 1
+                if combo.consume:
+                    state.clear()
+
+    def track(self, name):
+        """Top 10 players by successful combos."""
+        return dict(sorted(self.counts[name].items(), key=lambda x: x[1], reverse=True)[:10])
 
     def track_distress_combo(self):
-        active_buffs = {}
-        success_count = {}
-        
-        for line in self.log_lines:
-            timestamp = self.timestamp_pattern.search(line)
-            if not timestamp:
-                continue
-                
-            current_time = datetime.strptime(timestamp.group(1), '%Y-%m-%d %H:%M:%S')
-            
-            if match := self.retribution_pattern.search(line):
-                player = match.group(2).strip()
-                if player not in active_buffs:
-                    active_buffs[player] = {}
-                active_buffs[player]['retribution'] = current_time
-            
-            elif match := self.toughen_pattern.search(line):
-                player = match.group(2).strip()
-                if player not in active_buffs:
-                    active_buffs[player] = {}
-                active_buffs[player]['toughen'] = current_time
-            
-            elif match := self.bull_rush_pattern.search(line):
-                player = match.group(2).strip()
-                if player not in active_buffs:
-                    active_buffs[player] = {}
-                active_buffs[player]['bull_rush'] = current_time
-            
-            elif match := self.mocking_howl_pattern.search(line):
-                player = match.group(2).strip()
-                if player in active_buffs:
-                    buffs = active_buffs[player]
-                    if len(buffs) >= 3:  # Has all required buffs
-                        ret_active = (current_time - buffs.get('retribution', current_time)).total_seconds() <= 59
-                        tough_active = (current_time - buffs.get('toughen', current_time)).total_seconds() <= 9
-                        bull_active = (current_time - buffs.get('bull_rush', current_time)).total_seconds() <= 5
-                        
-                        if ret_active and tough_active and bull_active:
-                            success_count[player] = success_count.get(player, 0) + 1
-                
-                if player in active_buffs:
-                    active_buffs[player] = {}
-        
-        return dict(sorted(success_count.items(), key=lambda x: x[1], reverse=True)[:10])
+        return self.track(DISTRESS.name)
 
     def track_discord_combo(self):
-        active_discord = {}
-        success_count = {}
-        
-        for line in self.log_lines:
-            timestamp = self.timestamp_pattern.search(line)
-            if not timestamp:
-                continue
-            
-            current_time = datetime.strptime(timestamp.group(1), '%Y-%m-%d %H:%M:%S')
-            
-            if match := self.discord_pattern.search(line):
-                player = match.group(2).strip()
-                target = match.group(3).strip()
-                active_discord[target] = {'player': player, 'time': current_time}
-            
-            elif match := self.dissonance_pattern.search(line):
-                target = match.group(2).strip()
-                if target in active_discord:
-                    discord_data = active_discord[target]
-                    if (current_time - discord_data['time']).total_seconds() <= 3:
-                        player = discord_data['player']
-                        success_count[player] = success_count.get(player, 0) + 1
-        
-        return dict(sorted(success_count.items(), key=lambda x: x[1], reverse=True)[:10])
+        return self.track(DISCORD.name)
 
 def plot_combo_results(combo_data, title, color='blue'):
     if not combo_data:
@@ -1,49 +1,37 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, DAMAGE
+from exclusions import BOSS_ENTITIES, NPC_NAMES
 
 def DmgAbiLog(logfile, player, includePvE):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
 
     '''Extract Elements'''
-    dmg_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!')
     dmg_events = []
 
-    excluded_entities = ['Kraken', 'Black Dragon', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman', 'Charybdis']
     highest_hits = {}
     damage_by_ability = {}
     crit_count = {}
     total_count = {}
 
-    for line in lines:
-        if dmg_pattern.match(line):
-            result = dmg_pattern.findall(line)
-            attacker, receiver, ability, damage, crit_type = result[0][1], result[0][2], result[0][3], int(result[0][4]), result[0][5]
-
-            if attacker == player:
-                if includePvE == 0:
-                    if receiver.count(' ') == 0 and receiver not in excluded_entities:
-                        dmg_events.append((ability, damage, crit_type))
-                        if ability not in highest_hits or damage > highest_hits[ability]:
-                            highest_hits[ability] = damage
-                        if ability not in damage_by_ability:
-                            damage_by_ability[ability] = []
-                        damage_by_ability[ability].append(damage)
-
-                        if 'Critical' in crit_type:
-                            crit_count[ability] = crit_count.get(ability, 0) + 1
-                        total_count[ability] = total_count.get(ability, 0) + 1
-                elif includePvE == 1:
-                    dmg_events.append((ability, damage, crit_type))
-                    if ability not in highest_hits or damage > highest_hits[ability]:
-                        highest_hits[ability] = damage
-                    if ability not in damage_by_ability:
-                        damage_by_ability[ability] = []
-                    damage_by_ability[ability].append(damage)
-
-                    if 'Critical' in crit_type:
-                        crit_count[ability] = crit_count.get(ability, 0) + 1
-                    total_count[ability] = total_count.get(ability, 0) + 1
+    # Damage by the player, excluded events are never materialized
+    player_events = log.mask(DAMAGE) & (log.actor == log.name_id(player))
+    if includePvE == 0:
+        player_events &= ~log.name_lookup(NPC_NAMES)[log.target] \
+                         & ~log.name_lookup(BOSS_ENTITIES)[log.target]
+
+    for event in log.events(player_events):
+        ability, damage, crit = event.ability, event.amount, event.crit
+
+        dmg_events.append((ability, damage, crit))
+        if ability not in highest_hits or damage > highest_hits[ability]:
+            highest_hits[ability] = damage
+        if ability not in damage_by_ability:
+            damage_by_ability[ability] = []
+        damage_by_ability[ability].append(damage)
+
+        if crit:
+            crit_count[ability] = crit_count.get(ability, 0) + 1
+        total_count[ability] = total_count.get(ability, 0) + 1
 
     '''Collect & Calc events'''
     taken_log = {}
@@ -51,10 +39,10 @@ def DmgAbiLog(logfile, player, includePvE):
     total_damage = 0
     total_crit_damage = 0
 
-    for ability, damage, crit_type in dmg_events:
+    for ability, damage, crit in dmg_events:
         taken_log[ability] = taken_log.get(ability, 0) + damage
         total_damage += damage
-        if 'Critical' in crit_type:
+        if crit:
             crit_log[ability] = crit_log.get(ability, 0) + damage
             total_crit_damage += damage
 
@@ -76,7 +64,7 @@ def DmgAbiLog(logfile, player, includePvE):
     ax.set_xlabel('Damage Done', fontsize='x-large')
     ax.set_ylabel('Ability', fontsize='x-large')
     ax.invert_yaxis()
-    ax.set_title(f'Damage Done by {player} - {logfile} (1% Tolerance Applied)')
+    ax.set_title(f'Damage Done by {player} - {log.path} (1% Tolerance Applied)')
 
     for idx, ability in enumerate(abilities):
         total_crit = crit_log.get(ability, 0)
@@ -1,48 +1,25 @@
 import matplotlib.pyplot as plt
-import re
+from log_parser import parse_log, DAMAGE, PVE
+from aggregates import Totals
+from exclusions import DAMAGE_ENTITIES, RAID_ABILITIES
 
-def DamageLog(logfile, top_x, includePvE):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+def DamageTotals(logfile, includePvE, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
         
     '''Extract Elements'''
-    dmg_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!') 
-    dmg_events = []
-
-    excluded_entities = ['Red Dragon', 'Black Dragon', 'Kraken', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman', 'Charybdis', 'Anthalon', 'Bloodspire']
-    excluded_abilities = ['Corrosive Acid', "Black Dragon's Breath", "Red Dragon's Breath", "Clinging Flame", 
-                         "Roar Aftershock", "Clinging Flame Explosion", "Boulder Rain", "Guided Missiles", 
-                         "Earthquake", "Twisted Dance", "Anthalon's Sacrifice", "Crimson Mist", "Crimson Explosion", "Twisted Spear"]
-
-    for line in lines:
-        if dmg_pattern.match(line):
-            result = dmg_pattern.findall(line)
-            ability_used = result[0][3]
-            attacker = result[0][1].strip()
-            receiver = result[0][2].strip()
-            if includePvE == 0:
-                if receiver.count(' ') == 0 \
-                and attacker.count(' ') == 0 \
-                and attacker not in excluded_entities \
-                and ability_used not in excluded_abilities:
-                    dmg_events.append(result[0])
-            elif includePvE == 1:
-                if attacker not in excluded_entities \
-                and ability_used not in excluded_abilities:
-                    dmg_events.append(result[0])
+    dmg_events = log.mask(DAMAGE) \
+                 & ~log.name_lookup(DAMAGE_ENTITIES)[log.actor] \
+                 & ~log.name_lookup(RAID_ABILITIES)[log.ability]
+    if includePvE == 0:
+        # Player vs player only, both sides without spaces in their names
+        dmg_events &= ~log.has_flag(PVE)
 
     '''Collect & Calc events'''
-    dmg_log = {}
-    for event in dmg_events:
-        caster   = event[1]
-        damage   = int(event[4])
-
-        if caster not in dmg_log:
-            dmg_log[caster] = damage
-        else:
-            dmg_log[caster] += damage
+    return Totals.from_events(log, log.actor, dmg_events)
 
-    dmg_log = dict(sorted(dmg_log.items(), key=lambda x:x[1], reverse=False)[-25:])
+def DamageLog(logfile, includePvE, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
+    dmg_log = DamageTotals(log, includePvE).finalize(25, ascending=True)
 
     '''Plot Details'''
     dmg_plot = plt.figure(figsize=(12,8), facecolor='#c1c1c1')
@@ -51,7 +28,7 @@ def DamageLog(logfile, top_x, includePvE):
     ax.barh(width=list(dmg_log.values()), y=list(dmg_log.keys()), color='red', zorder=2)
     ax.set_xlabel('Damage', fontsize='x-large')
     ax.set_ylabel('Entity', fontsize='x-large')
-    ax.set_title(logfile[:-4])
+    ax.set_title(log.path[:-4])
     
     # Fix tick labels
     xticks = ax.get_xticks()
@@ -1,63 +1,46 @@
-import re
+import numpy as np
 import pandas as pd
 import xlsxwriter
 import matplotlib.pyplot as plt
+from log_parser import parse_log, DAMAGE, PVE
+from exclusions import PERCENTILE_PVP_EXCLUDED, PERCENTILE_PVE_ENTITIES
 
 def DmgAbiLog(logfile, players, includePvE, excel_filename, graph_filename):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
 
     '''Extract Elements'''
-    dmg_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!')
-    dmg_events = []
-
-    for line in lines:
-        if dmg_pattern.match(line):
-            result = dmg_pattern.findall(line)
-            if includePvE == 0:
-                if result[0][2].count(' ') == 0 \
-                and result[0][1].count(' ') == 0 \
-                and not any(ele in ['Kraken'] for ele in result[0]):
-                    if not players:
-                        dmg_events.append(result[0])
-                    else:
-                        if result[0][1] in players:
-                            dmg_events.append(result[0])
-
-            elif includePvE == 1:
-                if not any(ele in result[0][1] for ele in ['Black Dragon', 'Kraken', 'Flame Field', 'Jola the Cursed']):
-                    if not players:
-                        dmg_events.append(result[0])
-                    else:
-                        if result[0][1] in players:
-                            dmg_events.append(result[0])
+    # Excluded events are filtered on the columns and never materialized
+    dmg_rows = log.mask(DAMAGE)
+    if includePvE == 0:
+        excluded = log.name_lookup(PERCENTILE_PVP_EXCLUDED)
+        dmg_rows &= ~log.has_flag(PVE) & ~excluded[log.actor] & ~excluded[log.target] & ~excluded[log.ability]
+    elif includePvE == 1:
+        dmg_rows &= ~log.name_lookup(PERCENTILE_PVE_ENTITIES)[log.actor]
+    else:
+        dmg_rows[:] = False
+    if players:
+        dmg_rows &= np.isin(log.actor, log.name_ids(players))
 
     '''Collect & Calc events'''
-    abi_logs = {player: {} for player in players}
-    total_damage = {player: 0 for player in players}
+    # Keyed by name ids, names are only looked up for the final table
+    player_ids = {player: log.name_id(player) for player in players}
+    abi_logs = {}  # {(player, ability): damage}
+    total_damage = {player_id: 0 for player_id in player_ids.values()}
     abilities_set = set()
 
-    for event in dmg_events:
-        player = event[1]
-        ability = event[3]
-        damage = int(event[4])
-
-        if ability in abi_logs[player]:
-            abi_logs[player][ability] += damage
-        else:
-            abi_logs[player][ability] = damage
-
+    for player, ability, damage in log.columns(dmg_rows, 'actor', 'ability', 'amount'):
+        abi_logs[player, ability] = abi_logs.get((player, ability), 0) + damage
         total_damage[player] += damage
         abilities_set.add(ability)
 
-    abilities_list = list(abilities_set)
+    abilities_list = sorted(abilities_set)
 
     # Create a Pandas DataFrame with separate columns for each player
-    data = {'Ability': abilities_list}
+    data = {'Ability': [log.names[ability] for ability in abilities_list]}
 
-    for player in players:
-        damage = [abi_logs[player].get(ability, 0) for ability in abilities_list]
-        percentage = [int((d / total_damage[player]) * 100) if total_damage[player] > 0 else 0 for d in damage]
+    for player, player_id in player_ids.items():
+        damage = [abi_logs.get((player_id, ability), 0) for ability in abilities_list]
+        percentage = [int((d / total_damage[player_id]) * 100) if total_damage[player_id] > 0 else 0 for d in damage]
         data[player] = damage
         data[player + ' (%)'] = percentage
 
@@ -1,31 +1,20 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, DAMAGE
+from exclusions import RAID_ENTITIES, DAMAGE_TAKEN_ABILITIES, NPC_NAMES
 
 def DmgTakenFromLog(logfile, player, includePvE):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
         
     '''Extract Elements'''
-    dmg_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!')
-    dmg_events = []
-    
-    excluded_entities = ['Kraken', 'Black Dragon', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman', 'Charybdis', 'Anthalon', 'Bloodspire']
-    excluded_abilities = ['Corrosive Acid', "Black Dragon's Breath", "Red Dragon's Breath", "Clinging Flame", 
-                         "Roar Aftershock", "Clinging Flame Explosion", "Boulder Rain", "Guided Missiles", 
-                         "Earthquake", "Shoot Acid"]
+    # Only include damage to specified player, excluded events are never materialized
+    player_events = log.mask(DAMAGE) \
+                    & (log.target == log.name_id(player)) \
+                    & ~log.name_lookup(RAID_ENTITIES)[log.actor]
+    if includePvE == 0:
+        player_events &= ~log.name_lookup(NPC_NAMES)[log.actor] \
+                         & ~log.name_lookup(DAMAGE_TAKEN_ABILITIES)[log.ability]
 
-    for line in lines:
-        if dmg_pattern.match(line):
-            result = dmg_pattern.findall(line)
-            attacker, receiver, ability, damage = result[0][1], result[0][2], result[0][3], int(result[0][4])
-            
-            if receiver == player:  # Only include damage to specified player
-                if includePvE == 0:
-                    if attacker.count(' ') == 0 and attacker not in excluded_entities and ability not in excluded_abilities:
-                        dmg_events.append((attacker, ability, damage))
-                elif includePvE == 1:
-                    if attacker not in excluded_entities:
-                        dmg_events.append((attacker, ability, damage))
+    dmg_events = [(event.actor, event.ability, event.amount) for event in log.events(player_events)]
 
     '''Collect & Calc events'''
     dmg_log = {}  # {attacker: total_damage}
@@ -58,7 +47,7 @@ def DmgTakenFromLog(logfile, player, includePvE):
     ax.set_xlabel('Damage Done', fontsize='x-large')
     ax.set_ylabel('Attacker', fontsize='x-large')
     ax.invert_yaxis()  # Show highest damage at top
-    ax.set_title(f'Damage Taken by {player} - {logfile} (1% Tolerance Applied)')
+    ax.set_title(f'Damage Taken by {player} - {log.path} (1% Tolerance Applied)')
 
     # Add ability breakdown annotations
     for i, (attacker, total_damage) in enumerate(dmg_log.items()):
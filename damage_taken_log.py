@@ -1,57 +1,27 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, DAMAGE, PVE
+from aggregates import Totals
+from exclusions import DAMAGE_TAKEN_ENTITIES, RAID_ABILITIES
 
-def DmgRecLog(logfile, top_x, includePvE):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+def DmgRecTotals(logfile, includePvE, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
         
     '''Extract Elements'''
-    dmg_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!')
-    dmg_events = []
+    excluded = log.name_lookup(DAMAGE_TAKEN_ENTITIES)
 
-    excluded_entities = [
-        'Black Dragon', 'Kraken', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman',
-        'Charybdis', 'Anthalon', 'Bloodspire', 'Nightmare Warrior', 'Nightmare Archer', 'Scarlet Incubus'
-    ]
-    excluded_abilities = ['Corrosive Acid', "Black Dragon's Breath", "Red Dragon's Breath", "Clinging Flame", 
-                         "Roar Aftershock", "Clinging Flame Explosion", "Boulder Rain", "Guided Missiles", 
-                         "Earthquake", "Twisted Dance", "Anthalon's Sacrifice", "Crimson Mist", "Crimson Explosion", "Twisted Spear"]
-    
-    excluded_normalized = [e.lower() for e in excluded_entities]
-
-    for line in lines:
-        if dmg_pattern.match(line):
-            result = dmg_pattern.findall(line)
-            attacker = result[0][1].strip()
-            receiver = result[0][2].strip()
-            ability = result[0][3]
-            attacker_normalized = attacker.lower()
-            receiver_normalized = receiver.lower()
-            # Filter out if either attacker or receiver is an excluded entity
-            if includePvE == 0:
-                if (attacker.count(' ') == 0 and receiver.count(' ') == 0 and
-                    attacker_normalized not in excluded_normalized and
-                    receiver_normalized not in excluded_normalized and
-                    ability not in excluded_abilities):
-                    dmg_events.append(result[0])
-            else:
-                if (attacker_normalized not in excluded_normalized and
-                    receiver_normalized not in excluded_normalized and
-                    ability not in excluded_abilities):
-                    dmg_events.append(result[0])
+    # Filter out if either attacker or receiver is an excluded entity
+    dmg_events = log.mask(DAMAGE) \
+                 & ~excluded[log.actor] \
+                 & ~excluded[log.target] \
+                 & ~log.name_lookup(RAID_ABILITIES)[log.ability]
+    if includePvE == 0:
+        dmg_events &= ~log.has_flag(PVE)
 
     '''Collect & Calc events'''
-    drec_log = {}
-    for event in dmg_events:
-        receiver = event[2]
-        damage = int(event[4])
-
-        if receiver not in drec_log:
-            drec_log[receiver] = damage
-        else:
-            drec_log[receiver] += damage
+    return Totals.from_events(log, log.target, dmg_events)
 
-    drec_log = dict(sorted(drec_log.items(), key=lambda x: x[1], reverse=False)[-top_x:])
+def DmgRecLog(logfile, top_x, includePvE, start_time=None, end_time=None):
+    drec_log = DmgRecTotals(logfile, includePvE, start_time, end_time).finalize(top_x, ascending=True)
 
     '''Plot Details'''
     drec_plot = plt.figure(figsize=(12, 8), facecolor='#c1c1c1')
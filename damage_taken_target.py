@@ -1,45 +1,37 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, DAMAGE
+from exclusions import RAID_ENTITIES, DAMAGE_TAKEN_ABILITIES, NPC_NAMES
 
 def DmgTakenByPlayer(logfile, player, includePvE):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
         
     '''Extract Elements'''
-    dmg_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r attacked (.+?)\|r using \|cff57d6ae(.*?)\|r\|r and caused \|cffc13d36-(\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(.+?)\|r\|r\)!')
     dmg_events = []
 
-    excluded_entities = ['Kraken', 'Black Dragon', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman', 'Charybdis', 'Anthalon', 'Bloodspire']
-    excluded_abilities = ['Corrosive Acid', "Black Dragon's Breath", "Red Dragon's Breath", "Clinging Flame", 
-                         "Roar Aftershock", "Clinging Flame Explosion", "Boulder Rain", "Guided Missiles", 
-                         "Earthquake", "Shoot Acid"]
     highest_hits = {}
     
-    for line in lines:
-        if dmg_pattern.match(line):
-            result = dmg_pattern.findall(line)
-            attacker, receiver, ability, damage, crit_type = result[0][1], result[0][2], result[0][3], int(result[0][4]), result[0][5]
-            
-            if receiver == player:
-                if includePvE == 0:
-                    if attacker.count(' ') == 0 and attacker not in excluded_entities and ability not in excluded_abilities:
-                        dmg_events.append((ability, damage, crit_type))
-                        if ability not in highest_hits or damage > highest_hits[ability]:
-                            highest_hits[ability] = damage
-                elif includePvE == 1:
-                    dmg_events.append((ability, damage, crit_type))
-                    if ability not in highest_hits or damage > highest_hits[ability]:
-                        highest_hits[ability] = damage
+    # Damage to the player, excluded events are never materialized
+    player_events = log.mask(DAMAGE) & (log.target == log.name_id(player))
+    if includePvE == 0:
+        player_events &= ~log.name_lookup(NPC_NAMES)[log.actor] \
+                         & ~log.name_lookup(RAID_ENTITIES)[log.actor] \
+                         & ~log.name_lookup(DAMAGE_TAKEN_ABILITIES)[log.ability]
+
+    for event in log.events(player_events):
+        ability, damage, crit = event.ability, event.amount, event.crit
+        dmg_events.append((ability, damage, crit))
+        if ability not in highest_hits or damage > highest_hits[ability]:
+            highest_hits[ability] = damage
     
     '''Collect & Calc events'''
     taken_log = {}
     crit_log = {}
     total_damage = 0
     
-    for ability, damage, crit_type in dmg_events:
+    for ability, damage, crit in dmg_events:
         taken_log[ability] = taken_log.get(ability, 0) + damage
         total_damage += damage
-        if 'Critical' in crit_type:
+        if crit:
             crit_log[ability] = crit_log.get(ability, 0) + damage
     
     # Apply tolerance filter (1% of total damage)
@@ -59,7 +51,7 @@ def DmgTakenByPlayer(logfile, player, includePvE):
     plt.xlabel('Damage Taken', fontsize='x-large')
     plt.ylabel('Ability', fontsize='x-large')
     plt.gca().invert_yaxis()  # Flip the plot to have highest at the top
-    plt.title(f'Damage Taken by {player} - {logfile} (1% Tolerance Applied)')
+    plt.title(f'Damage Taken by {player} - {log.path} (1% Tolerance Applied)')
     plt.legend()
     
     # Annotate highest individual hits on the plot
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 # Import your existing analysis functions
 from damage_log import DamageLog
 from damage_taken_log import DmgRecLog
+from log_parser import remove_sidecar
 # ...existing imports...
 
 class LogCache:
@@ -22,6 +23,7 @@ class LogCache:
         # Save new log file
         if self.log_path and os.path.exists(self.log_path):
             os.remove(self.log_path)
+            remove_sidecar(self.log_path)
             
         self.log_path = f"temp_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
         await attachment.save(self.log_path)
@@ -33,6 +35,7 @@ class LogCache:
             return None
         if datetime.now() > self.expiry_time:
             os.remove(self.log_path)
+            remove_sidecar(self.log_path)
             self.log_path = None
             return None
         return self.log_path
@@ -40,6 +43,7 @@ class LogCache:
     def clear(self):
         if self.log_path and os.path.exists(self.log_path):
             os.remove(self.log_path)
+            remove_sidecar(self.log_path)
         self.log_path = None
         self.expiry_time = None
 
@@ -76,7 +80,7 @@ async def damage(ctx):
         return
 
     try:
-        _, plot = DamageLog(log_path, (0, 24), includePvE=0)
+        _, plot = DamageLog(log_path, includePvE=0)
         buf = io.BytesIO()
         plot.savefig(buf, format='png')
         buf.seek(0)
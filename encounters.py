@@ -0,0 +1,121 @@
+import mmap
+import weakref
+from collections import namedtuple
+import numpy as np
+from event_store import DAMAGE, ATTACK
+from exclusions import ENCOUNTER_BOSSES
+from log_parser import seek_time, source_file, to_datetime
+
+# Seconds without any damage or attack that end an encounter
+COMBAT_GAP = 30
+
+# start_row, end_row:       rows start_row:end_row of the parsed log
+# start_time, end_time:     epoch seconds of the first and last combat event
+# boss:                     boss the encounter was fought against, '' for trash
+# wipe:                     the boss survived (it kept acting after the last hit
+#                           on it, or it was pulled again later in the log)
+# start_offset, end_offset: byte range of the encounter in the log file, None
+#                           unless the log was parsed from a file that is still
+#                           unchanged on disk (not e.g. for an upload)
+Encounter = namedtuple('Encounter', [
+    'start_row', 'end_row', 'start_time', 'end_time', 'boss', 'wipe', 'start_offset', 'end_offset'
+])
+
+
+def find_encounters(log, gap=COMBAT_GAP):
+    """Split a parsed log into encounters on gaps of more than gap seconds between combat events."""
+    combat = np.flatnonzero(log.mask(DAMAGE, ATTACK))
+    if not len(combat):
+        return []
+
+    times = log.timestamp[combat]
+    breaks = np.flatnonzero(np.diff(times) > gap)
+    firsts = np.append(0, breaks + 1)
+    lasts = np.append(breaks, len(combat) - 1)
+    is_boss = log.name_lookup(ENCOUNTER_BOSSES)
+
+    segments = []
+    for first, last in zip(firsts.tolist(), lasts.tolist()):
+        start_time, end_time = int(times[first]), int(times[last])
+        # Buffs, casts etc. in the same seconds as the fighting belong to the encounter
+        start_row = int(np.searchsorted(log.timestamp, start_time, side='left'))
+        end_row = int(np.searchsorted(log.timestamp, end_time, side='right'))
+
+        rows = combat[first:last + 1]
+        actors, targets = log.actor[rows], log.target[rows]
+        boss_ids = np.concatenate([actors[is_boss[actors]], targets[is_boss[targets]]])
+        boss, wipe = '', False
+        if len(boss_ids):
+            boss_id = int(np.bincount(boss_ids).argmax())
+            boss = log.names[boss_id]
+            hits = rows[(targets == boss_id) & (log.kind[rows] == DAMAGE)]
+            actions = rows[actors == boss_id]
+            wipe = len(actions) > 0 and (not len(hits) or log.timestamp[actions[-1]] > log.timestamp[hits[-1]])
+        segments.append([start_row, end_row, start_time, end_time, boss, bool(wipe)])
+
+    # Every pull of a boss before its last one was a wipe
+    last_pull = {segment[4]: i for i, segment in enumerate(segments) if segment[4]}
+    for i, segment in enumerate(segments):
+        if segment[4] and last_pull[segment[4]] != i:
+            segment[5] = True
+
+    offsets = [(None, None)] * len(segments)
+    path = source_file(log)
+    if path is not None and log.source[1]:
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            offsets = [(seek_time(buffer, segment[2]), seek_time(buffer, segment[3] + 1)) for segment in segments]
+
+    return [Encounter(*segment, *offset) for segment, offset in zip(segments, offsets)]
+
+
+class EncounterIndex:
+    """Encounters of one parsed log, so an analysis can run on a single pull.
+
+    Each encounter is a contiguous row range of the log, restricting a report
+    to it is a slice of the columns instead of filtering the whole log.
+    """
+
+    def __init__(self, log, gap=COMBAT_GAP):
+        self.log = log
+        self.gap = gap
+        self.encounters = find_encounters(log, gap)
+
+    def __len__(self):
+        return len(self.encounters)
+
+    def __iter__(self):
+        return iter(self.encounters)
+
+    def __getitem__(self, i):
+        return self.encounters[i]
+
+    def log_for(self, i):
+        """EventStore of encounter i only."""
+        encounter = self.encounters[i]
+        return self.log.slice(encounter.start_row, encounter.end_row)
+
+    def pulls(self, boss):
+        """Indexes of the encounters against a boss, in log order."""
+        return [i for i, encounter in enumerate(self.encounters) if encounter.boss == boss]
+
+    def label(self, i):
+        """Short description of encounter i, e.g. for a selection box."""
+        encounter = self.encounters[i]
+        name = encounter.boss or 'Trash'
+        if encounter.boss:
+            name += ' (wipe)' if encounter.wipe else ' (kill)'
+        start = to_datetime(encounter.start_time).strftime('%H:%M:%S')
+        end = to_datetime(encounter.end_time).strftime('%H:%M:%S')
+        return f"{i + 1}. {name} {start} - {end}"
+
+
+# Built once per parsed log, dropped together with the log
+_indexes = weakref.WeakKeyDictionary()
+
+
+def encounter_index(log, gap=COMBAT_GAP):
+    """EncounterIndex of a parsed log, cached per log."""
+    index = _indexes.get(log)
+    if index is None or index.gap != gap:
+        index = _indexes[log] = EncounterIndex(log, gap)
+    return index
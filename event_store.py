@@ -0,0 +1,284 @@
+import json
+import os
+from array import array
+from collections import namedtuple
+import numpy as np
+
+# Event kinds, stored as int8 codes in the kind column
+DAMAGE = 1          # attacked ... and caused -N Health
+ATTACK = 2          # attacked ... without a damage amount (missed, dodged, ...)
+HEAL = 3            # targeted ... to restore N health
+BUFF = 4            # gained the buff
+DEBUFF = 5          # was struck by a ... debuff
+CLEARED = 6         # 's ... debuff cleared
+CAST = 7            # successfully cast
+CASTING = 8         # is casting (cast start, e.g. boss mechanics)
+
+# Bits of the flags column
+CRIT = 1            # critical damage
+SELF = 2            # actor and target are the same entity
+PVE = 4             # actor or target is an NPC (name with a space)
+
+# On-disk layout of a saved EventStore, bump SCHEMA_VERSION when it changes
+SCHEMA_VERSION = 1
+COLUMNS = [
+    ('kind', np.int8),
+    ('timestamp', np.int64),
+    ('actor', np.int32),
+    ('target', np.int32),
+    ('ability', np.int32),
+    ('amount', np.int64),
+    ('flags', np.uint8),
+]
+
+
+def save_table(base_path, table, schema_version, meta):
+    """Write a numpy table to base_path.npy and schema_version plus meta to base_path.json."""
+    # Write to temporary files first so readers never see a half written table
+    with open(base_path + '.npy.tmp', 'wb') as f:
+        np.save(f, table)
+    with open(base_path + '.json.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'schema_version': schema_version, **meta}, f)
+    os.replace(base_path + '.npy.tmp', base_path + '.npy')
+    os.replace(base_path + '.json.tmp', base_path + '.json')
+
+
+def load_table(base_path, schema_version, mmap_mode=None):
+    """Read a table written by save_table().
+
+    Returns (table, meta), or None if it is missing, unreadable or was
+    written with another schema version.
+    """
+    try:
+        with open(base_path + '.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.pop('schema_version', None) != schema_version:
+            return None
+        table = np.load(base_path + '.npy', mmap_mode=mmap_mode)
+    except (OSError, ValueError):
+        return None
+    return table, meta
+
+
+# timestamp: epoch seconds of the log's (naive) timestamp
+# actor:     who did it (attacker, healer, caster, player gaining/losing the effect)
+# target:    who received it (empty for buffs, debuffs and casts)
+# ability:   ability, buff or debuff name
+# amount:    damage or healing done (0 when not applicable)
+# crit:      True for critical damage
+Event = namedtuple('Event', ['kind', 'timestamp', 'actor', 'target', 'ability', 'amount', 'crit'])
+
+
+class EventStore:
+    """Columnar table of all tracked events of one log file, in log order.
+
+    Names (actors, targets, abilities) share one interned string table and
+    the columns only hold their int32 ids. source is (absolute path, size,
+    mtime_ns) of the log file the table was parsed from, None when it did
+    not come from a file (e.g. an upload); parse_log() sets it.
+    """
+
+    def __init__(self, path, names, kind, timestamp, actor, target, ability, amount, flags, source=None):
+        self.path = path
+        self.source = source
+        self.names = names
+        self.kind = kind
+        self.timestamp = timestamp
+        self.actor = actor
+        self.target = target
+        self.ability = ability
+        self.amount = amount
+        self.flags = flags
+        self._ids = {name: i for i, name in enumerate(names)}
+        self._lookups = {}
+
+    def __len__(self):
+        return len(self.kind)
+
+    @property
+    def nbytes(self):
+        """Approximate memory held by the table, including the string table."""
+        columns = (self.kind, self.timestamp, self.actor, self.target, self.ability, self.amount, self.flags)
+        return sum(column.nbytes for column in columns) + sum(len(name) + 100 for name in self.names)
+
+    def name_id(self, name):
+        """Id of a name in the string table, -1 if it never occurs in the log."""
+        return self._ids.get(name, -1)
+
+    def name_ids(self, names):
+        """Array of ids for the names that occur in the log."""
+        return np.array([self._ids[name] for name in names if name in self._ids], dtype=np.int32)
+
+    def name_lookup(self, names):
+        """Boolean array over the string table, True for names in names (a set or ExclusionRule).
+
+        Index it with a name column to test every event in one step, e.g.
+        log.name_lookup(rule)[log.actor]. Cached per names object.
+        """
+        lookup = self._lookups.get(id(names))
+        if lookup is None or lookup[0] is not names:
+            values = np.fromiter((name in names for name in self.names), dtype=bool, count=len(self.names))
+            lookup = self._lookups[id(names)] = (names, values)
+        return lookup[1]
+
+    def mask(self, *kinds):
+        """Boolean row mask for the given event kinds."""
+        if len(kinds) == 1:
+            return self.kind == kinds[0]
+        return np.isin(self.kind, kinds)
+
+    def has_flag(self, flag):
+        """Boolean row mask of events with the flag bit set."""
+        return (self.flags & flag) != 0
+
+    def save(self, base_path, **meta):
+        """Write the table to base_path.npy (columns) and base_path.json (string table, metadata)."""
+        table = np.empty(len(self), dtype=COLUMNS)
+        for column, _ in COLUMNS:
+            table[column] = getattr(self, column)
+
+        save_table(base_path, table, SCHEMA_VERSION, {'path': self.path, 'names': self.names, **meta})
+
+    @classmethod
+    def load(cls, base_path):
+        """Memory-map a table written by save().
+
+        Returns (store, meta), or None if it is missing, unreadable or was
+        written with another schema version.
+        """
+        loaded = load_table(base_path, SCHEMA_VERSION, mmap_mode='r')
+        if loaded is None:
+            return None
+
+        table, meta = loaded
+        names = meta.pop('names')
+        store = cls(meta.pop('path'), names, *(table[column] for column, _ in COLUMNS))
+        return store, meta
+
+    @classmethod
+    def concat(cls, stores, path):
+        """Join tables in order into one, e.g. the parsed chunks of one log.
+
+        The string tables are merged in order as well, so names get the same
+        ids as when the whole log is parsed in one go.
+        """
+        names = []
+        ids = {}
+        parts = {column: [] for column, _ in COLUMNS}
+        for store in stores:
+            for name in store.names:
+                if name not in ids:
+                    ids[name] = len(names)
+                    names.append(name)
+            remap = np.array([ids[name] for name in store.names], dtype=np.int32)
+            for column, _ in COLUMNS:
+                values = getattr(store, column)
+                parts[column].append(remap[values] if column in ('actor', 'target', 'ability') else values)
+
+        return cls(path, names, *(np.concatenate(parts[column]).astype(dtype, copy=False) for column, dtype in COLUMNS))
+
+    @staticmethod
+    def remove_saved(base_path):
+        """Delete the files written by save(), if any."""
+        for suffix in ('.npy', '.json'):
+            if os.path.exists(base_path + suffix):
+                os.remove(base_path + suffix)
+
+    def slice(self, start, end):
+        """The rows start:end (e.g. one encounter) as an EventStore.
+
+        Columns are views of this table's columns and the string table is
+        shared, so slicing copies no events.
+        """
+        columns = (getattr(self, column)[start:end] for column, _ in COLUMNS)
+        return EventStore(self.path, self.names, *columns, source=self.source)
+
+    def time_slice(self, start_time=None, end_time=None):
+        """The rows with start_time <= timestamp < end_time (epoch seconds), see slice().
+
+        Rows are in log order and log timestamps only go up, so both ends are
+        a binary search on the timestamp column. None leaves that end open.
+        """
+        start = 0 if start_time is None else int(np.searchsorted(self.timestamp, start_time, side='left'))
+        end = len(self) if end_time is None else int(np.searchsorted(self.timestamp, end_time, side='left'))
+        return self.slice(start, max(start, end))
+
+    def select(self, *kinds):
+        """Iterate over the events of the given kinds as Event tuples, in log order."""
+        return self.events(self.mask(*kinds))
+
+    def columns(self, mask, *columns):
+        """Iterate over the masked rows as tuples of the given columns (names as int ids).
+
+        Cheaper than events() when aggregating: no Event tuples and no name
+        strings, ids make small, fast dict keys.
+        """
+        rows = np.flatnonzero(mask)
+        return zip(*(getattr(self, column)[rows].tolist() for column in columns))
+
+    def events(self, mask):
+        """Iterate over the masked rows as Event tuples, in log order.
+
+        Filtering with a mask first means rows that are not needed are never
+        turned into Python objects at all.
+        """
+        rows = np.flatnonzero(mask)
+        names = self.names
+        columns = zip(
+            self.kind[rows].tolist(), self.timestamp[rows].tolist(), self.actor[rows].tolist(),
+            self.target[rows].tolist(), self.ability[rows].tolist(), self.amount[rows].tolist(),
+            self.flags[rows].tolist()
+        )
+        for kind, timestamp, actor, target, ability, amount, flags in columns:
+            yield Event(kind, timestamp, names[actor], names[target], names[ability], amount, bool(flags & CRIT))
+
+
+class EventStoreBuilder:
+    """Appends events into compact typed arrays and freezes them into an EventStore."""
+
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+        self.kind = array('b')
+        self.timestamp = array('q')
+        self.actor = array('i')
+        self.target = array('i')
+        self.ability = array('i')
+        self.amount = array('q')
+        self.flags = array('B')
+
+    def intern(self, name):
+        name_id = self.ids.get(name)
+        if name_id is None:
+            name_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def append(self, event):
+        flags = 0
+        if event.crit:
+            flags |= CRIT
+        if event.target and event.actor == event.target:
+            flags |= SELF
+        if ' ' in event.actor or ' ' in event.target:
+            flags |= PVE
+
+        self.kind.append(event.kind)
+        self.timestamp.append(event.timestamp)
+        self.actor.append(self.intern(event.actor))
+        self.target.append(self.intern(event.target))
+        self.ability.append(self.intern(event.ability))
+        self.amount.append(event.amount)
+        self.flags.append(flags)
+
+    def build(self, path):
+        return EventStore(
+            path, self.names,
+            np.frombuffer(self.kind, dtype=np.int8),
+            np.frombuffer(self.timestamp, dtype=np.int64),
+            np.frombuffer(self.actor, dtype=np.int32),
+            np.frombuffer(self.target, dtype=np.int32),
+            np.frombuffer(self.ability, dtype=np.int32),
+            np.frombuffer(self.amount, dtype=np.int64),
+            np.frombuffer(self.flags, dtype=np.uint8),
+        )
@@ -0,0 +1,58 @@
+import re
+
+
+class ExclusionRule:
+    """Set of names a report leaves out: exact names plus names containing a substring.
+
+    Exact names are a frozenset lookup and all substrings are compiled into
+    one alternation, so checking a name is a single lookup and a single scan.
+    Against a parsed log, EventStore.name_lookup() evaluates the rule once per
+    distinct name and filtering the events becomes an array lookup.
+    """
+
+    def __init__(self, names=(), substrings=(), ignore_case=False):
+        self.ignore_case = ignore_case
+        self.names = frozenset(name.lower() if ignore_case else name for name in names)
+        self.substrings = tuple(substrings)
+        self.pattern = None
+        if self.substrings:
+            flags = re.IGNORECASE if ignore_case else 0
+            self.pattern = re.compile('|'.join(re.escape(substring) for substring in self.substrings), flags)
+
+    def __contains__(self, name):
+        if (name.lower() if self.ignore_case else name) in self.names:
+            return True
+        return self.pattern is not None and self.pattern.search(name) is not None
+
+    def extend(self, names=(), substrings=()):
+        """New rule with additional names and substrings."""
+        return ExclusionRule(self.names | set(names), self.substrings + tuple(substrings), self.ignore_case)
+
+
+# Bosses, adds and environment of the raids and world bosses
+BOSS_ENTITIES = ExclusionRule(['Kraken', 'Black Dragon', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman', 'Charybdis'])
+RAID_ENTITIES = BOSS_ENTITIES.extend(['Anthalon', 'Bloodspire'])
+DAMAGE_ENTITIES = RAID_ENTITIES.extend(['Red Dragon'])
+# Damage taken ignores case, as some adds show up in different casing
+DAMAGE_TAKEN_ENTITIES = ExclusionRule(
+    RAID_ENTITIES.names | {'Nightmare Warrior', 'Nightmare Archer', 'Scarlet Incubus'}, ignore_case=True
+)
+# Percentile comparisons drop the Kraken (as entity or ability) in PvP, and any
+# name containing one of the PvE names, e.g. summons of the boss
+PERCENTILE_PVP_EXCLUDED = ExclusionRule(['Kraken'])
+PERCENTILE_PVE_ENTITIES = ExclusionRule(substrings=['Black Dragon', 'Kraken', 'Flame Field', 'Jola the Cursed'])
+
+# Bosses that give an encounter its name, the other raid entities are adds and environment
+ENCOUNTER_BOSSES = ExclusionRule(['Black Dragon', 'Kraken', 'Charybdis', 'Jola the Cursed', 'Anthalon', 'Bloodspire', 'Red Dragon'])
+
+# Boss and environment abilities that would otherwise count as player damage
+ENVIRONMENT_ABILITIES = ExclusionRule([
+    'Corrosive Acid', "Black Dragon's Breath", "Red Dragon's Breath", "Clinging Flame",
+    "Roar Aftershock", "Clinging Flame Explosion", "Boulder Rain", "Guided Missiles", "Earthquake"
+])
+RAID_ABILITIES = ENVIRONMENT_ABILITIES.extend([
+    "Twisted Dance", "Anthalon's Sacrifice", "Crimson Mist", "Crimson Explosion", "Twisted Spear"
+])
+DAMAGE_TAKEN_ABILITIES = ENVIRONMENT_ABILITIES.extend(['Shoot Acid'])
+# NPC names have spaces, player names never do
+NPC_NAMES = ExclusionRule(substrings=[' '])
@@ -0,0 +1,291 @@
+import glob
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Any, Tuple
+import numpy as np
+import pandas as pd
+from event_store import save_table, load_table
+from encounters import EncounterIndex
+from ghosts import GhostAnalyzer, GhostWave, ghost_events
+from log_parser import parse_log
+
+logger = logging.getLogger(__name__)
+
+# On-disk layout of a saved GhostHistory, bump SCHEMA_VERSION when it changes
+SCHEMA_VERSION = 2
+COLUMNS = [
+    ('pull', np.int32),          # index into the pulls table
+    ('wave', np.int32),          # wave number within the pull, from 1
+    ('wave_start', np.int64),    # epoch seconds of the ghost spawn
+    ('player', np.int32),        # index into the player names
+    ('cleared', np.bool_),       # whether the player cleared the debuff during the wave
+    ('clear_time', np.float32),  # seconds from debuff to first clear, NaN if not cleared
+]
+
+
+def wave_rows(waves: List[GhostWave]) -> List[Tuple[int, int, str, bool, float]]:
+    """One (wave, wave_start, player, cleared, clear_time) row per player hit by one of the waves."""
+    rows = []
+    for number, wave in enumerate(waves, 1):
+        first_clear = {}
+        for player, clear_time in zip(wave.clears, wave.times):
+            first_clear.setdefault(player, clear_time)
+        for player in wave.players:
+            cleared = player in first_clear
+            rows.append((number, wave.start, player, cleared, first_clear[player] if cleared else float('nan')))
+    return rows
+
+
+def analyze_log_waves(path: str) -> Optional[Tuple[Dict[str, Any], List[Tuple[Dict[str, Any], list]]]]:
+    """Run the ghost analysis over one log, runs in a worker process for batches.
+
+    The log is split into encounters (see encounters.find_encounters) and
+    every encounter with ghost waves is one pull, so several attempts in one
+    log are separate pulls. Ghost events outside any encounter are ignored.
+
+    Args:
+        path: Path to the log file
+
+    Returns:
+        The log record (path, size, mtime_ns) and a (pull, rows) pair per pull:
+        the pull record (path, encounter, start, end, waves, boss_power) and its
+        wave_rows(), or None if the log no longer exists
+    """
+    try:
+        stat = os.stat(path)
+        # Logs are read once per change, a sidecar would only be clutter
+        log = parse_log(path, sidecar=False)
+    except FileNotFoundError:
+        logger.warning(f"Skipping {path}, it was removed before it could be analyzed")
+        return None
+
+    index = EncounterIndex(log)
+    pulls = []
+    for i, encounter in enumerate(index):
+        # Only the waves are needed, no report
+        analyzer = GhostAnalyzer()
+        analyzer.feed(ghost_events(index.log_for(i)))
+        waves = analyzer.all_waves()
+        if not waves:
+            continue
+        pull = {
+            'path': path,
+            'encounter': i,
+            'start': waves[0].start,
+            'end': encounter.end_time,
+            'waves': len(waves),
+            'boss_power': analyzer.boss_power
+        }
+        pulls.append((pull, wave_rows(waves)))
+
+    return {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}, pulls
+
+
+class GhostHistory:
+    """Ghost wave results of many pulls, one row per player hit by a wave.
+
+    A pull is one encounter with ghost waves, a log can hold several or none.
+    The rows are compact numpy columns with player names interned, plus a
+    per-player row index, so trends across pulls (e.g. a player's p90 clear
+    time over the last 20 pulls) are answered without re-parsing any log.
+    Logs already in the history are skipped unless they changed on disk.
+    """
+
+    def __init__(self):
+        self.logs: Dict[str, Dict[str, Any]] = {}
+        self.pulls: List[Dict[str, Any]] = []
+        self.names: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.columns = {column: np.empty(0, dtype=dtype) for column, dtype in COLUMNS}
+        self._player_rows: Optional[Dict[int, np.ndarray]] = None
+
+    def __len__(self) -> int:
+        return len(self.columns['pull'])
+
+    def add_logs(self, paths: Iterable[str], workers: int = 1) -> int:
+        """Analyze the logs that are new or changed since they were added.
+
+        Args:
+            paths: Log file paths
+            workers: Number of worker processes, each analyzes whole logs
+
+        Returns:
+            Number of logs analyzed
+        """
+        todo = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                # e.g. deleted between globbing the directory and getting here
+                logger.warning(f"Skipping {path}, it no longer exists")
+                continue
+            known = self.logs.get(path)
+            if known is None or known['size'] != stat.st_size or known['mtime_ns'] != stat.st_mtime_ns:
+                todo.append(path)
+        if not todo:
+            return 0
+
+        if workers > 1 and len(todo) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+                results = list(pool.map(analyze_log_waves, todo))
+        else:
+            results = [analyze_log_waves(path) for path in todo]
+
+        self._remove_pulls(set(todo))
+        results = [result for result in results if result is not None]
+        for record, pulls in results:
+            self.logs[record['path']] = record
+            for pull, rows in pulls:
+                self._add_pull(pull, rows)
+        logger.info(f"Added {len(results)} logs to the ghost history ({len(self.pulls)} pulls, {len(self)} rows)")
+        return len(results)
+
+    def add_directory(self, directory: str, pattern: str = '*.log', workers: int = 1) -> int:
+        """Analyze the new or changed logs of a directory, see add_logs."""
+        return self.add_logs(sorted(glob.glob(os.path.join(directory, pattern))), workers)
+
+    def _add_pull(self, pull: Dict[str, Any], rows: List[Tuple[int, int, str, bool, float]]) -> None:
+        pull_id = len(self.pulls)
+        self.pulls.append(pull)
+        if not rows:
+            return
+        waves, wave_starts, players, cleared, clear_times = zip(*rows)
+        new = {
+            'pull': np.full(len(rows), pull_id),
+            'wave': waves,
+            'wave_start': wave_starts,
+            'player': [self._intern(player) for player in players],
+            'cleared': cleared,
+            'clear_time': clear_times
+        }
+        for column, dtype in COLUMNS:
+            self.columns[column] = np.concatenate([self.columns[column], np.asarray(new[column], dtype=dtype)])
+        self._player_rows = None
+
+    def _remove_pulls(self, paths: set) -> None:
+        for path in paths:
+            self.logs.pop(path, None)
+        removed = [i for i, pull in enumerate(self.pulls) if pull['path'] in paths]
+        if not removed:
+            return
+        # Renumber the remaining pulls and drop the rows of the removed ones
+        remap = np.full(len(self.pulls), -1, dtype=np.int32)
+        kept = [i for i in range(len(self.pulls)) if i not in set(removed)]
+        remap[kept] = np.arange(len(kept), dtype=np.int32)
+        keep_rows = remap[self.columns['pull']] >= 0
+        for column, _ in COLUMNS:
+            self.columns[column] = self.columns[column][keep_rows]
+        self.columns['pull'] = remap[self.columns['pull']]
+        self.pulls = [self.pulls[i] for i in kept]
+        self._player_rows = None
+
+    def _intern(self, name: str) -> int:
+        player_id = self.ids.get(name)
+        if player_id is None:
+            player_id = self.ids[name] = len(self.names)
+            self.names.append(name)
+        return player_id
+
+    @property
+    def player_rows(self) -> Dict[int, np.ndarray]:
+        """Row index per player id, rows in pull and wave order. Built on first use."""
+        if self._player_rows is None:
+            pull_order = np.argsort(np.argsort([pull['start'] for pull in self.pulls], kind='stable'))
+            player = self.columns['player']
+            rows = np.lexsort((self.columns['wave'], pull_order[self.columns['pull']], player))
+            players, bounds = np.unique(player[rows], return_index=True)
+            bounds = np.append(bounds, len(rows))
+            self._player_rows = {int(p): rows[bounds[i]:bounds[i + 1]] for i, p in enumerate(players)}
+        return self._player_rows
+
+    def last_pulls(self, count: int) -> np.ndarray:
+        """Ids of the count most recent pulls, by the time of their first ghost wave."""
+        starts = np.array([pull['start'] for pull in self.pulls], dtype=np.int64)
+        return np.argsort(starts, kind='stable')[-count:] if count else np.empty(0, dtype=np.int64)
+
+    def _rows(self, player: Optional[str] = None, last_pulls: Optional[int] = None) -> np.ndarray:
+        if player is None:
+            rows = np.arange(len(self))
+        else:
+            player_id = self.ids.get(player)
+            rows = self.player_rows.get(player_id, np.empty(0, dtype=np.int64))
+        if last_pulls is not None:
+            rows = rows[np.isin(self.columns['pull'][rows], self.last_pulls(last_pulls))]
+        return rows
+
+    def clear_times(self, player: str, last_pulls: Optional[int] = None) -> np.ndarray:
+        """Clear times (seconds) of a player's cleared debuffs, in pull and wave order.
+
+        Args:
+            player: Player name
+            last_pulls: Only the most recent pulls, None for all
+        """
+        rows = self._rows(player, last_pulls)
+        return self.columns['clear_time'][rows[self.columns['cleared'][rows]]]
+
+    def percentile(self, player: str, q: float, last_pulls: Optional[int] = None) -> float:
+        """q-th percentile of a player's clear times, NaN if they never cleared."""
+        times = self.clear_times(player, last_pulls)
+        return float(np.percentile(times, q)) if len(times) else float('nan')
+
+    def player_summary(self, last_pulls: Optional[int] = None) -> pd.DataFrame:
+        """Per player: debuffs taken and cleared, clear rate and median / p90 clear time."""
+        rows = self._rows(last_pulls=last_pulls)
+        if not len(rows):
+            return pd.DataFrame()
+        frame = pd.DataFrame({
+            'Player': np.array(self.names, dtype=object)[self.columns['player'][rows]],
+            'cleared': self.columns['cleared'][rows],
+            'clear_time': self.columns['clear_time'][rows]
+        })
+        grouped = frame.groupby('Player', sort=False)
+        summary = pd.DataFrame({
+            'Total': grouped.size(),
+            'Cleared': grouped['cleared'].sum(),
+            'Median Clear Time': grouped['clear_time'].median(),
+            'P90 Clear Time': grouped['clear_time'].quantile(0.9)
+        })
+        summary['Clear Rate'] = summary['Cleared'] / summary['Total'] * 100
+        return summary.reset_index().sort_values(by=['Clear Rate', 'Median Clear Time'], ascending=[False, True])
+
+    def pull_summary(self) -> pd.DataFrame:
+        """Per pull (oldest first): log, encounter, start, end, waves, boss power, clear rate and median clear time."""
+        pulls = pd.DataFrame(self.pulls)
+        if pulls.empty:
+            return pulls
+        frame = pd.DataFrame({
+            'pull': self.columns['pull'],
+            'cleared': self.columns['cleared'],
+            'clear_time': self.columns['clear_time']
+        }).groupby('pull')
+        pulls['Clear Rate'] = frame['cleared'].mean() * 100
+        pulls['Median Clear Time'] = frame['clear_time'].median()
+        pulls['start'] = pd.to_datetime(pulls['start'], unit='s')
+        pulls['end'] = pd.to_datetime(pulls['end'], unit='s')
+        return pulls.sort_values(by='start', kind='stable')
+
+    def save(self, base_path: str) -> None:
+        """Write the history to base_path.npy (rows) and base_path.json (logs, pulls, player names)."""
+        table = np.empty(len(self), dtype=COLUMNS)
+        for column, _ in COLUMNS:
+            table[column] = self.columns[column]
+
+        save_table(base_path, table, SCHEMA_VERSION, {'logs': self.logs, 'pulls': self.pulls, 'names': self.names})
+
+    @classmethod
+    def load(cls, base_path: str) -> 'GhostHistory':
+        """Read a history written by save(), an empty one if it is missing or outdated."""
+        history = cls()
+        loaded = load_table(base_path, SCHEMA_VERSION)
+        if loaded is None:
+            return history
+
+        table, meta = loaded
+        history.logs = meta['logs']
+        history.pulls = meta['pulls']
+        history.names = meta['names']
+        history.ids = {name: i for i, name in enumerate(history.names)}
+        history.columns = {column: np.asarray(table[column]) for column, _ in COLUMNS}
+        return history
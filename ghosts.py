@@ -1,12 +1,99 @@
-import re
+import io
 import logging
+import mmap
+import os
+import re
 from datetime import datetime
-from typing import Dict, List, Optional, Any, Union, Pattern
+from typing import BinaryIO, Callable, Dict, Iterable, List, Optional, Any, Union
+import numpy as np
 import pandas as pd
 from collections import defaultdict
+from log_parser import READ_BUFFER_SIZE, Event, iter_buffer_events, parse_line, parse_timestamp, to_datetime, BUFF, DEBUFF, CLEARED, CASTING
+
+logger = logging.getLogger(__name__)
+
+# Event kinds and abilities the ghost analysis looks at
+GHOST_EVENT_KINDS = (CASTING, DEBUFF, CLEARED, BUFF)
+GHOST_ABILITIES = ('Penetrating Dark Energy', 'Devilish Contract')
+# Every ghost related line contains one of the abilities, other lines are never parsed
+GHOST_PREFILTER = re.compile('|'.join(re.escape(ability) for ability in GHOST_ABILITIES).encode())
+
+
+def iter_ghost_events(lines: Iterable[str]) -> Iterable[Event]:
+    """Lazily parse the ghost related lines of an iterable of log lines into events."""
+    for line in lines:
+        # Literal checks first, the full line patterns only run on the few candidate lines
+        if GHOST_ABILITIES[0] in line or GHOST_ABILITIES[1] in line:
+            event = parse_line(line)
+            if event is not None:
+                yield event
+
+
+def iter_mmap_ghost_events(log_file: str) -> Iterable[Event]:
+    """Lazily parse the ghost related lines of a memory-mapped log file into events.
+    
+    The combined ability pattern jumps from candidate line to candidate line,
+    only those lines are matched against the line patterns and decoded.
+    """
+    with open(log_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            pos = 0
+            while (match := GHOST_PREFILTER.search(buffer, pos)) is not None:
+                line_start = buffer.rfind(b'\n', 0, match.start()) + 1
+                line_end = buffer.find(b'\n', match.end())
+                if line_end == -1:
+                    line_end = len(buffer)
+                yield from iter_buffer_events(buffer, line_start, line_end)
+                pos = line_end + 1
+
+
+def ghost_events(log) -> Iterable[Event]:
+    """Ghost related events of a parsed EventStore, other rows never become Event tuples."""
+    mask = log.mask(*GHOST_EVENT_KINDS) & np.isin(log.ability, log.name_ids(GHOST_ABILITIES))
+    return log.events(mask)
+
 
-# Enable logging
-logging.basicConfig(level=logging.INFO, format='%(message)s')
+class GhostDebuff:
+    """A Penetrating Dark Energy debuff on one player, times in epoch seconds."""
+    __slots__ = ('player', 'start', 'cleared', 'clear_time')
+
+    def __init__(self, player: str, start: int):
+        self.player = player
+        self.start = start
+        self.cleared = False
+        self.clear_time: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Report form, with datetimes and clear_time only once cleared."""
+        debuff = {'player': self.player, 'start': to_datetime(self.start), 'cleared': self.cleared}
+        if self.clear_time is not None:
+            debuff['clear_time'] = to_datetime(self.clear_time)
+        return debuff
+
+
+class GhostWave:
+    """Players hit by one ghost spawn, the ones who cleared it and their clear times."""
+    __slots__ = ('start', 'players', 'player_set', 'clears', 'times')
+
+    def __init__(self, start: int):
+        self.start = start
+        self.players: List[str] = []  # In order of being hit
+        self.player_set = set()       # Same players, for membership checks
+        self.clears: List[str] = []
+        self.times: List[float] = []
+
+
+class GhostPlayerStats:
+    """Debuffs taken and cleared by one player across all waves."""
+    __slots__ = ('total', 'cleared', 'failed', 'avg_time')
+
+    def __init__(self):
+        self.total = 0
+        self.cleared = 0
+        self.failed = 0
+        self.avg_time = 0.0
 
 
 class GhostAnalyzer:
@@ -15,31 +102,28 @@ class GhostAnalyzer:
     Tracks when debuffs are applied to players and if/when they are cleared.
     """
     
-    def __init__(self):
-        """Initialize the analyzer with regex patterns and empty state."""        # Define raw regex patterns
-        self.patterns_raw = {            
-            'spawn': r"<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;Black Dragon\|r is casting \|cff57d6aePenetrating Dark Energy\|r\|r!",
-            'debuff': r"<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r was struck by a \|cff57d6aePenetrating Dark Energy\|r\|r debuff!",
-            'clear': r"<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r's \|cff57d6aePenetrating Dark Energy\|r\|r debuff cleared",
-            'power': r"<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;Black Dragon\|r gained the buff: \|cff57d6aeDevilish Contract\|r\|r"
-        }
-        
-        # Compile patterns for better performance
-        self.patterns: Dict[str, Pattern] = {
-            name: re.compile(pattern) for name, pattern in self.patterns_raw.items()
-        }
+    def __init__(self, debug_every: int = 0):
+        """Initialize the analyzer with empty state.
         
+        Args:
+            debug_every: Log every Nth ghost event at DEBUG level, 0 to log none
+        """
+        self.debug_every = debug_every
         self.reset()
     
     def reset(self) -> None:
         """Reset the analyzer state for a new analysis."""
-        self.waves: List[Dict[str, Any]] = []
-        self.current_wave: Optional[Dict[str, Any]] = None
-        self.player_stats = defaultdict(lambda: {'total': 0, 'cleared': 0, 'failed': 0, 'avg_time': 0.0})
+        self.waves: List[GhostWave] = []
+        self.current_wave: Optional[GhostWave] = None
+        self.player_stats: Dict[str, GhostPlayerStats] = defaultdict(GhostPlayerStats)
         self.boss_power: int = 0
-        self.debuff_events: List[Dict[str, Any]] = []
+        self.debuff_events: List[GhostDebuff] = []
         # Track active debuffs by player for faster lookups
-        self.active_debuffs: Dict[str, Dict[str, Any]] = {}
+        self.active_debuffs: Dict[str, GhostDebuff] = {}
+        # Match counts of events passed to feed()
+        self.pattern_matches: Dict[str, int] = {'spawn': 0, 'debuff': 0, 'clear': 0, 'power': 0}
+        # Ghost events seen, for sampling the debug messages
+        self.debug_count = 0
 
     def parse_timestamp(self, ts_str: str) -> datetime:
         """Parse a timestamp string into a datetime object.
@@ -51,9 +135,9 @@ class GhostAnalyzer:
             datetime object
         """
         try:
-            return datetime.strptime(ts_str, "%Y-%m-%d %H:%M:%S")
+            return to_datetime(parse_timestamp(ts_str))
         except ValueError as e:
-            logging.error(f"Failed to parse timestamp '{ts_str}': {e}")
+            logger.error(f"Failed to parse timestamp '{ts_str}': {e}")
             # Return current time as fallback
             return datetime.now()
         
@@ -63,119 +147,172 @@ class GhostAnalyzer:
         Args:
             log_data: The full log content as a string
             
+        Returns:
+            Dictionary containing analysis results
+        """
+        # Iterate the string lazily instead of splitting it into a list of lines
+        return self.analyze_events(iter_ghost_events(io.StringIO(log_data)))
+
+    def analyze_events(self, events: Iterable[Event]) -> Dict[str, Any]:
+        """Analyze parsed log events for ghost mechanics.
+        
+        Events are consumed one at a time, so this runs in constant memory for
+        lazily produced events (e.g. iter_log_events or ghost_events).
+        
+        Args:
+            events: Parsed log events in log order
+            
         Returns:
             Dictionary containing analysis results
         """
         self.reset()
         
-        logging.info("Starting ghost analysis...")
-        lines = log_data.splitlines()
-        total_lines = len(lines)
-        logging.info(f"Total lines in log: {total_lines}")
-        line_count = 0
+        logger.info("Starting ghost analysis...")
         pattern_matches = {'spawn': 0, 'debuff': 0, 'clear': 0, 'power': 0}
         
-        # Log example patterns we're looking for
-        logging.info("Ghost patterns to match:")
-        for pattern_name, pattern in self.patterns_raw.items():
-            logging.info(f"{pattern_name}: {pattern}")
+        # Process the log event by event
+        for event in events:
+            self._process_event(event, pattern_matches)
+                
+        return self._finish_analysis(pattern_matches)
+
+    def feed(self, events: Iterable[Event]) -> None:
+        """Add more events to the running analysis, e.g. lines appended to a live log.
+        
+        Unlike analyze_events the state is not reset, call reset() to start over.
+        
+        Args:
+            events: Parsed log events in log order, following the ones fed before
+        """
+        for event in events:
+            self._process_event(event, self.pattern_matches)
+
+    def report(self) -> Dict[str, Any]:
+        """Build the report of everything fed so far, without ending the analysis.
+        
+        Returns:
+            Same dictionary as analyze_log
+        """
+        return self.generate_report(self.all_waves())
+
+    def all_waves(self) -> List[GhostWave]:
+        """The closed waves plus the current one, which stays open for the next feed."""
+        return self.waves + [self.current_wave] if self.current_wave else self.waves
+
+    def _debug(self, message: str, *args: Any) -> None:
+        """Log a sampled debug message, formatted only when it is actually logged."""
+        self.debug_count += 1
+        if self.debug_count % self.debug_every == 0:
+            logger.debug(message, *args)
+
+    def _process_event(self, event: Event, pattern_matches: Dict[str, int]) -> None:
+        """Update the analysis state with a single parsed log event.
         
-        # Process the log line by line
-        for line in lines:
-            line_count += 1
+        Args:
+            event: Parsed log event
+            pattern_matches: Dictionary to update with pattern match counts
+        """
+        # Check spawn
+        if event.kind == CASTING:
+            if event.actor != 'Black Dragon' or event.ability != 'Penetrating Dark Energy':
+                return
+            pattern_matches['spawn'] += 1
+            if self.current_wave:
+                self.waves.append(self.current_wave)
+            self.current_wave = GhostWave(event.timestamp)
+            if self.debug_every:
+                self._debug("Found ghost spawn at %s", to_datetime(event.timestamp))
+                
+        # Check debuff
+        elif event.kind == DEBUFF:
+            if event.ability != 'Penetrating Dark Energy':
+                return
+            pattern_matches['debuff'] += 1
+            if not self.current_wave:
+                return
+            player = event.actor
             
-            # Log sample lines periodically for debugging
-            if line_count % 1000 == 0:
-                logging.info(f"Processing line {line_count}/{total_lines} ({line_count/total_lines*100:.1f}%)")
-                logging.info(f"Sample line: {line[:200]}")
+            # Skip non-player entities (mounts, pets, etc.)
+            if "Mount" in player or "Companion" in player:
+                if self.debug_every:
+                    self._debug("Skipping non-player entity: %s", player)
+                return
             
-            # Check for pattern matches one by one to avoid redundant regex searches
-            # Check spawn
-            if spawn_match := self.patterns['spawn'].search(line):
-                pattern_matches['spawn'] += 1
-                if self.current_wave:
-                    self.waves.append(self.current_wave)
-                timestamp = self.parse_timestamp(spawn_match.group(1))
-                self.current_wave = {'start': timestamp, 'players': [], 'clears': [], 'times': []}
-                logging.info(f"Found ghost spawn at {timestamp}")
-                continue  # Skip other checks for this line
-                    # Check debuff
-            elif debuff_match := self.patterns['debuff'].search(line):
-                pattern_matches['debuff'] += 1
-                if not self.current_wave:
-                    continue
-                timestamp = self.parse_timestamp(debuff_match.group(1))
-                player = debuff_match.group(2).strip()
-                
-                # Skip non-player entities (mounts, pets, etc.)
-                if "Mount" in player or "Companion" in player:
-                    logging.info(f"Skipping non-player entity: {player}")
-                    continue
-                
-                # Only track new debuffs for this player in the current wave
-                if player not in self.current_wave['players']:
-                    self.current_wave['players'].append(player)
-                    self.player_stats[player]['total'] += 1
-                
-                # Create debuff event and add to tracking
-                event = {'player': player, 'start': timestamp, 'cleared': False}
-                self.debuff_events.append(event)
-                self.active_debuffs[player] = event
-                logging.info(f"Found ghost debuff on {player} at {timestamp}")
-                continue
-                
-            # Check clear
-            elif clear_match := self.patterns['clear'].search(line):
-                pattern_matches['clear'] += 1
-                timestamp = self.parse_timestamp(clear_match.group(1))
-                player = clear_match.group(2).strip()
-                logging.info(f"Found ghost clear for {player} at {timestamp}")
+            # Only track new debuffs for this player in the current wave
+            wave = self.current_wave
+            if player not in wave.player_set:
+                wave.player_set.add(player)
+                wave.players.append(player)
+                self.player_stats[player].total += 1
+            
+            # Create debuff event and add to tracking
+            debuff = GhostDebuff(player, event.timestamp)
+            self.debuff_events.append(debuff)
+            self.active_debuffs[player] = debuff
+            if self.debug_every:
+                self._debug("Found ghost debuff on %s at %s", player, to_datetime(event.timestamp))
+            
+        # Check clear
+        elif event.kind == CLEARED:
+            if event.ability != 'Penetrating Dark Energy':
+                return
+            pattern_matches['clear'] += 1
+            player = event.actor
+            if self.debug_every:
+                self._debug("Found ghost clear for %s at %s", player, to_datetime(event.timestamp))
+            
+            # Check if player has an active debuff (much faster than iterating all events)
+            if player in self.active_debuffs:
+                debuff = self.active_debuffs[player]
+                debuff.cleared = True
+                debuff.clear_time = event.timestamp
+                clear_time = float(event.timestamp - debuff.start)
                 
-                # Check if player has an active debuff (much faster than iterating all events)
-                if player in self.active_debuffs:
-                    event = self.active_debuffs[player]
-                    event['cleared'] = True
-                    event['clear_time'] = timestamp
-                    clear_time = (timestamp - event['start']).total_seconds()
+                wave = self.current_wave
+                if wave and player in wave.player_set:
+                    wave.clears.append(player)
+                    wave.times.append(clear_time)
+                    stats = self.player_stats[player]
+                    stats.cleared += 1
+                    stats.avg_time = (stats.avg_time * (stats.cleared - 1) + clear_time) / stats.cleared
+                # Remove from active debuffs
+                del self.active_debuffs[player]
                     
-                    if self.current_wave and player in self.current_wave['players']:
-                        self.current_wave['clears'].append(player)
-                        self.current_wave['times'].append(clear_time)
-                        self.player_stats[player]['cleared'] += 1
-                        self.player_stats[player]['avg_time'] = (
-                            (self.player_stats[player]['avg_time'] * (self.player_stats[player]['cleared'] - 1) + 
-                            clear_time) / self.player_stats[player]['cleared']
-                        )
-                    # Remove from active debuffs
-                    del self.active_debuffs[player]
-                continue
-                        
-            # Check power gain
-            elif power_match := self.patterns['power'].search(line):
-                pattern_matches['power'] += 1
-                self.boss_power += 10  # Each stack is 10%
-                logging.info(f"Found boss power gain at {self.parse_timestamp(power_match.group(1))}")
-                
+        # Check power gain
+        elif event.kind == BUFF:
+            if event.actor != 'Black Dragon' or event.ability != 'Devilish Contract':
+                return
+            pattern_matches['power'] += 1
+            self.boss_power += 10  # Each stack is 10%
+            if self.debug_every:
+                self._debug("Found boss power gain at %s", to_datetime(event.timestamp))
+
+    def _finish_analysis(self, pattern_matches: Dict[str, int]) -> Dict[str, Any]:
+        """Close the last wave, finalize player stats and build the report."""
         # Add final wave
         if self.current_wave:
-            self.waves.append(self.current_wave)        # Calculate final stats
-        for player in self.player_stats:
-            self.player_stats[player]['failed'] = (
-                self.player_stats[player]['total'] - self.player_stats[player]['cleared']
-            )
+            self.waves.append(self.current_wave)
+
+        # Calculate final stats
+        for stats in self.player_stats.values():
+            stats.failed = stats.total - stats.cleared
             
-        logging.info("Ghost analysis complete")
-        logging.info(f"Pattern matches: {pattern_matches}")
-        logging.info(f"Total waves found: {len(self.waves)}")
-        logging.info(f"Total players affected: {len(self.player_stats)}")
-        logging.info(f"Final boss power: {self.boss_power}%")
-        logging.info(f"Active uncleared debuffs: {len(self.active_debuffs)}")
+        logger.info(
+            "Ghost analysis complete: pattern matches %s, %d waves, %d players affected, "
+            "final boss power %d%%, %d active uncleared debuffs",
+            pattern_matches, len(self.waves), len(self.player_stats), self.boss_power, len(self.active_debuffs)
+        )
 
         return self.generate_report()
         
-    def generate_report(self) -> Dict[str, Any]:
+    def generate_report(self, waves: Optional[List[GhostWave]] = None) -> Dict[str, Any]:
         """Generate a final report from the analysis results.
         
+        Only reads the analysis state, so it can also report a running analysis.
+        
+        Args:
+            waves: Waves to report, defaults to the closed waves
+            
         Returns:
             Dictionary containing:
                 - success: Whether the analysis found any waves
@@ -185,7 +322,9 @@ class GhostAnalyzer:
                 - boss_power: Final boss power percentage
                 - debuff_events: Raw event data for all debuffs
         """
-        if not self.waves:
+        if waves is None:
+            waves = self.waves
+        if not waves:
             return {
                 'success': False,
                 'message': 'No ghost waves found in log'
@@ -193,23 +332,24 @@ class GhostAnalyzer:
         player_data = []
         for player, stats in self.player_stats.items():
             try:
-                clear_rate = f"{(stats['cleared'] / max(stats['total'], 1) * 100):.1f}%" if stats['total'] > 0 else "N/A"
-                avg_time = f"{stats['avg_time']:.1f}s" if stats['avg_time'] > 0 else "N/A"
+                clear_rate = f"{(stats.cleared / max(stats.total, 1) * 100):.1f}%" if stats.total > 0 else "N/A"
+                avg_time = f"{stats.avg_time:.1f}s" if stats.avg_time > 0 else "N/A"
                 
                 player_data.append({
                     'Player': player,
-                    'Total': stats['total'],
-                    'Cleared': stats['cleared'],
-                    'Failed': stats['failed'],
+                    'Total': stats.total,
+                    'Cleared': stats.cleared,
+                    'Failed': stats.total - stats.cleared,
                     'Clear Rate': clear_rate,
                     'Avg Clear Time': avg_time
                 })
             except Exception as e:
-                logging.error(f"Error processing player {player}: {e}")
+                logger.error(f"Error processing player {player}: {e}")
                 continue
                 
         # Create DataFrame from collected data
-        stats_df = pd.DataFrame(player_data) if player_data else pd.DataFrame()
+        # Keep the columns when no player was hit yet (e.g. right after the first spawn), so sorting still works
+        stats_df = pd.DataFrame(player_data, columns=['Player', 'Total', 'Cleared', 'Failed', 'Clear Rate', 'Avg Clear Time'])
 
         # Sort by clear rate descending
         stats_df = stats_df.sort_values(
@@ -219,13 +359,13 @@ class GhostAnalyzer:
 
         # Wave summary
         wave_summary = []
-        for i, wave in enumerate(self.waves, 1):
-            failed = set(wave['players']) - set(wave['clears'])
-            avg_time = sum(wave['times']) / len(wave['times']) if wave['times'] else 0
+        for i, wave in enumerate(waves, 1):
+            failed = wave.player_set - set(wave.clears)
+            avg_time = sum(wave.times) / len(wave.times) if wave.times else 0
             wave_summary.append({
                 'Wave': i,
-                'Players Hit': len(wave['players']),
-                'Cleared': len(wave['clears']),
+                'Players Hit': len(wave.players),
+                'Cleared': len(wave.clears),
                 'Failed': len(failed),
                 'Avg Clear Time': f"{avg_time:.1f}s",
                 'Failed Players': ', '.join(failed) if failed else 'None'
@@ -235,150 +375,76 @@ class GhostAnalyzer:
             'success': True,
             'player_stats': stats_df,
             'wave_summary': pd.DataFrame(wave_summary),
-            'total_waves': len(self.waves),
+            'total_waves': len(waves),
             'boss_power': self.boss_power,
-            'debuff_events': self.debuff_events
+            'debuff_events': [debuff.to_dict() for debuff in self.debuff_events]
         }
-    def stream_log_analysis(self, log_file: str, chunk_size: int = 10000) -> Dict[str, Any]:
-        """Process a large log file in chunks to conserve memory.
+    def stream_log_analysis(self, log_file: Union[str, BinaryIO], chunk_size: int = 10000, use_mmap: bool = False,
+                            progress: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+        """Process a large log file line by line to conserve memory.
         
         This method is useful for very large log files that would consume too
-        much memory if loaded entirely. It reads and processes the file in chunks.
+        much memory if loaded entirely. The file is read once, straight from
+        the file iterator, and only the ghost related lines are decoded and
+        parsed, so only the ghost state is kept in memory.
         
         Args:
-            log_file: Path to the log file
-            chunk_size: Number of lines to process at once
+            log_file: Path to the log file, or a binary file object (e.g. an upload)
+            chunk_size: Number of lines (ghost events with use_mmap) between progress reports
+            use_mmap: Memory-map the file (a path) and jump between ghost related lines instead of reading every line
+            progress: Called with the fraction of the file processed so far, by byte offset
             
         Returns:
             Same dictionary as analyze_log
         """
         self.reset()
-        logging.info(f"Starting streaming ghost analysis of {log_file}...")
+        logger.info(f"Starting streaming ghost analysis of {getattr(log_file, 'name', log_file)}...")
         
         pattern_matches = {'spawn': 0, 'debuff': 0, 'clear': 0, 'power': 0}
-        line_count = 0
         
         try:
-            # First pass to count total lines (optional, can be removed to save time)
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                total_lines = sum(1 for _ in f)
-                logging.info(f"Total lines in log: {total_lines}")
-                
-            # Second pass to actually process data
-            with open(log_file, 'r', encoding='utf-8', errors='ignore') as f:
-                lines_buffer = []
-                
-                for line in f:
-                    lines_buffer.append(line)
-                    line_count += 1
+            if use_mmap:
+                # Other lines are skipped by the scan, so progress counts ghost events
+                for event_count, event in enumerate(iter_mmap_ghost_events(log_file), 1):
+                    self._process_event(event, pattern_matches)
+                    if event_count % chunk_size == 0:
+                        logger.info(f"Processed {event_count} ghost events")
+                if progress:
+                    progress(1.0)
+                return self._finish_analysis(pattern_matches)
+
+            binary = open(log_file, 'rb', buffering=READ_BUFFER_SIZE) if isinstance(log_file, str) else log_file
+            f = io.TextIOWrapper(binary, encoding='utf-8', errors='ignore')
+            try:
+                # Progress is the byte offset read so far, no pass to count lines first
+                start = binary.tell()
+                total_bytes = max(binary.seek(0, os.SEEK_END) - start, 1)
+                binary.seek(start)
+                for line_count, line in enumerate(f, 1):
+                    if GHOST_ABILITIES[0] in line or GHOST_ABILITIES[1] in line:
+                        event = parse_line(line)
+                        if event is not None:
+                            self._process_event(event, pattern_matches)
                     
-                    # Process in chunks to conserve memory
-                    if len(lines_buffer) >= chunk_size:
-                        chunk_data = ''.join(lines_buffer)
-                        self._process_log_chunk(chunk_data, pattern_matches, line_count - chunk_size + 1)
-                        lines_buffer = []
-                        logging.info(f"Processed {line_count}/{total_lines} lines ({line_count/total_lines*100:.1f}%)")
-                
-                # Process remaining lines
-                if lines_buffer:
-                    chunk_data = ''.join(lines_buffer)
-                    self._process_log_chunk(chunk_data, pattern_matches, line_count - len(lines_buffer) + 1)
+                    if line_count % chunk_size == 0:
+                        offset = binary.tell() - start
+                        logger.info(f"Processed {line_count} lines, {offset / 1024 / 1024:.1f} MB ({offset / total_bytes * 100:.1f}%)")
+                        if progress:
+                            progress(offset / total_bytes)
+                if progress:
+                    progress(1.0)
+            finally:
+                # Leave a passed in file object open
+                f.detach()
+                if binary is not log_file:
+                    binary.close()
         
         except Exception as e:
-            logging.error(f"Error processing log file: {e}")
+            logger.error(f"Error processing log file: {e}")
             import traceback
-            logging.error(traceback.format_exc())
-            
-        # Calculate final stats same as in analyze_log
-        if self.current_wave:
-            self.waves.append(self.current_wave)
-            
-        for player in self.player_stats:
-            self.player_stats[player]['failed'] = (
-                self.player_stats[player]['total'] - self.player_stats[player]['cleared']
-            )
-            
-        logging.info("Ghost analysis complete")
-        logging.info(f"Pattern matches: {pattern_matches}")
-        logging.info(f"Total waves found: {len(self.waves)}")
-        logging.info(f"Total players affected: {len(self.player_stats)}")
-        logging.info(f"Final boss power: {self.boss_power}%")
-        logging.info(f"Active uncleared debuffs: {len(self.active_debuffs)}")
-
-        return self.generate_report()
-        
-    def _process_log_chunk(self, chunk_data: str, pattern_matches: Dict[str, int], start_line: int) -> None:
-        """Internal method to process a chunk of log data.
-        
-        Args:
-            chunk_data: String containing a chunk of the log file
-            pattern_matches: Dictionary to update with pattern match counts
-            start_line: The line number where this chunk begins
-        """
-        for i, line in enumerate(chunk_data.splitlines()):
-            line_num = start_line + i
+            logger.error(traceback.format_exc())
             
-            # Check spawn
-            if spawn_match := self.patterns['spawn'].search(line):
-                pattern_matches['spawn'] += 1
-                if self.current_wave:
-                    self.waves.append(self.current_wave)
-                timestamp = self.parse_timestamp(spawn_match.group(1))
-                self.current_wave = {'start': timestamp, 'players': [], 'clears': [], 'times': []}
-                continue
-                    # Check debuff
-            elif debuff_match := self.patterns['debuff'].search(line):
-                pattern_matches['debuff'] += 1
-                if not self.current_wave:
-                    continue
-                timestamp = self.parse_timestamp(debuff_match.group(1))
-                player = debuff_match.group(2).strip()
-                
-                # Skip non-player entities (mounts, pets, etc.)
-                if "Mount" in player or "Companion" in player:
-                    continue
-                
-                # Only track new debuffs for this player in the current wave
-                if player not in self.current_wave['players']:
-                    self.current_wave['players'].append(player)
-                    self.player_stats[player]['total'] += 1
-                
-                # Create debuff event and add to tracking
-                event = {'player': player, 'start': timestamp, 'cleared': False}
-                self.debuff_events.append(event)
-                self.active_debuffs[player] = event
-                continue
-                
-            # Check clear
-            elif clear_match := self.patterns['clear'].search(line):
-                pattern_matches['clear'] += 1
-                timestamp = self.parse_timestamp(clear_match.group(1))
-                player = clear_match.group(2).strip()
-                
-                # Check if player has an active debuff
-                if player in self.active_debuffs:
-                    event = self.active_debuffs[player]
-                    event['cleared'] = True
-                    event['clear_time'] = timestamp
-                    clear_time = (timestamp - event['start']).total_seconds()
-                    
-                    if self.current_wave and player in self.current_wave['players']:
-                        self.current_wave['clears'].append(player)
-                        self.current_wave['times'].append(clear_time)
-                        self.player_stats[player]['cleared'] += 1
-                        self.player_stats[player]['avg_time'] = (
-                            (self.player_stats[player]['avg_time'] * (self.player_stats[player]['cleared'] - 1) + 
-                            clear_time) / self.player_stats[player]['cleared']
-                        )
-                    # Remove from active debuffs
-                    del self.active_debuffs[player]
-                continue
-                        
-            # Check power gain
-            elif power_match := self.patterns['power'].search(line):
-                pattern_matches['power'] += 1
-                self.boss_power += 10  # Each stack is 10%
-
+        return self._finish_analysis(pattern_matches)
 
 if __name__ == "__main__":
     # This allows the module to be imported without running UI code
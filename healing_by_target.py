@@ -1,37 +1,33 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, HEAL
 
 def HealAbiLog(logfile, includeSelf, player):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
     heal_events = []
 
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            if includeSelf == 1:
+    for event in log.select(HEAL):
+        if includeSelf == 1:
+            if not player:
+                heal_events.append(event)
+            else:
+                if event.actor == player:
+                    heal_events.append(event)
+
+        elif includeSelf == 0:
+            if event.actor != event.target:
                 if not player:
-                    heal_events.append(result[0])
+                    heal_events.append(event)
                 else:
-                    if result[0][1] == player:
-                        heal_events.append(result[0])
-
-            elif includeSelf == 0:
-                if result[0][1] != result[0][2]:
-                    if not player:
-                        heal_events.append(result[0])
-                    else:
-                        if result[0][1] == player:
-                            heal_events.append(result[0])
+                    if event.actor == player:
+                        heal_events.append(event)
 
     '''Collect & Calc events'''
     heal_log = {}
     for event in heal_events:
-        ability = event[3]
-        heal = int(event[4])
+        ability = event.ability
+        heal = event.amount
 
         if ability in heal_log:
             heal_log[ability] += heal
@@ -52,9 +48,9 @@ def HealAbiLog(logfile, includeSelf, player):
     plt.ylabel('Ability', fontsize='x-large')
     
     if not player:
-        title = logfile[:-4]
+        title = log.path[:-4]
     else:
-        title = player + ' - ' + logfile[:-4]
+        title = player + ' - ' + log.path[:-4]
     plt.title(title)
     
     current_values = plt.gca().get_xticks()
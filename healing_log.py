@@ -1,35 +1,21 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, HEAL, SELF
+from aggregates import Totals
 
-def HealingLog(logfile, top_x, includeSelf):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+def HealingTotals(logfile, includeSelf, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
-    heal_events = []
-
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            if includeSelf == 1:
-                heal_events.append(result[0])
-            elif includeSelf == 0:
-                if result[0][1] != result[0][2]:
-                    heal_events.append(result[0])
+    heal_events = log.mask(HEAL)
+    if includeSelf == 0:
+        heal_events &= ~log.has_flag(SELF)
 
     '''Collect & Calc events'''
-    heal_log = {}
-    for event in heal_events:
-        caster = event[1]
-        heal = int(event[4])
-
-        if caster not in heal_log:
-            heal_log[caster] = heal
-        else:
-            heal_log[caster] += heal
+    return Totals.from_events(log, log.actor, heal_events)
 
-    heal_log = dict(sorted(heal_log.items(), key=lambda x: x[1], reverse=False)[-20:])
+def HealingLog(logfile, includeSelf, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
+    heal_log = HealingTotals(log, includeSelf).finalize(20, ascending=True)
 
     '''Plot Details'''
     heal_plot = plt.figure(figsize=(12, 18), facecolor='#c1c1c1')
@@ -38,7 +24,7 @@ def HealingLog(logfile, top_x, includeSelf):
     ax.barh(width=list(heal_log.values()), y=list(heal_log.keys()), color='green', zorder=2)
     ax.set_xlabel('Healing', fontsize='x-large')
     ax.set_ylabel('Entity', fontsize='x-large')
-    ax.set_title(logfile[:-4])
+    ax.set_title(log.path[:-4])
     
     # Fix tick labels
     xticks = ax.get_xticks()
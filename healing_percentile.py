@@ -1,24 +1,20 @@
-import re
 import pandas as pd
 import matplotlib.pyplot as plt
+from log_parser import parse_log, HEAL
 
 def HealAbiLog(logfile, players, includeSelf):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
     heal_events = []
 
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            if includeSelf == 1:
-                if not players or result[0][1] in players:
-                    heal_events.append(result[0])
-            elif includeSelf == 0:
-                if result[0][1] != result[0][2] and (not players or result[0][1] in players):
-                    heal_events.append(result[0])
+    for event in log.select(HEAL):
+        if includeSelf == 1:
+            if not players or event.actor in players:
+                heal_events.append(event)
+        elif includeSelf == 0:
+            if event.actor != event.target and (not players or event.actor in players):
+                heal_events.append(event)
 
     '''Collect & Calc events'''
     heal_logs = {player: {} for player in players}
@@ -26,9 +22,9 @@ def HealAbiLog(logfile, players, includeSelf):
     abilities_set = set()
 
     for event in heal_events:
-        player = event[1]
-        ability = event[3]
-        healing = int(event[4])
+        player = event.actor
+        ability = event.ability
+        healing = event.amount
 
         if player in players:
             heal_logs[player][ability] = heal_logs[player].get(ability, 0) + healing
@@ -1,32 +1,24 @@
-import re
 import matplotlib.pyplot as plt
+import numpy as np
+from log_parser import parse_log, HEAL, SELF
+from aggregates import Totals
 
-def PotsLog(logfile, top_x=25):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+POT_ABILITIES = {'Minor Healing Potion', 'Healing Potion', 'Grimoire', 'Ginseng'}
+
+def PotsTotals(logfile, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.*?)\|r targeted (.*?)\|r using \|cff57d6ae(Minor Healing Potion|Healing Potion|Grimoire|Ginseng)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
-    heal_events = []
-
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            if result[0][1].strip() == result[0][2].strip():  # Self-targeted only
-                heal_events.append(result[0])
+    heal_events = log.mask(HEAL) \
+                  & np.isin(log.ability, log.name_ids(POT_ABILITIES)) \
+                  & log.has_flag(SELF)  # Self-targeted only
 
     '''Collect & Calc events'''
-    pots_log = {}
-    for event in heal_events:
-        receiver = event[1].strip()
-        heal = int(event[4])
-
-        if receiver not in pots_log:
-            pots_log[receiver] = heal
-        else:
-            pots_log[receiver] += heal
+    return Totals.from_events(log, log.actor, heal_events)
 
-    pots_log = dict(sorted(pots_log.items(), key=lambda x: x[1], reverse=True)[:top_x])
+def PotsLog(logfile, top_x=25, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
+    pots_log = PotsTotals(log).finalize(top_x)
 
     '''Plot Details'''
     pots_plot = plt.figure(figsize=(12, 8), facecolor='#c1c1c1')
@@ -38,7 +30,7 @@ def PotsLog(logfile, top_x=25):
     ax.invert_yaxis()
     ax.set_xlabel('Healing from Pots', fontsize='x-large')
     ax.set_ylabel('Entity', fontsize='x-large')
-    ax.set_title(f'Healing from Pots - {logfile[:-4]}')
+    ax.set_title(f'Healing from Pots - {log.path[:-4]}')
     
     # Fix tick labels
     xticks = ax.get_xticks()
@@ -1,35 +1,20 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, HEAL, SELF
+from aggregates import Totals
 
-def HealRecLog(logfile, player="", top_x=25, SelfOnly=0):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+def HealRecTotals(logfile, SelfOnly=0, start_time=None, end_time=None):
+    log = parse_log(logfile, start_time=start_time, end_time=end_time)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
-    heal_events = []
-
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            if SelfOnly == 0:
-                if result[0][1] != result[0][2]:  # Exclude self heals
-                    heal_events.append(result[0])
-            else:
-                heal_events.append(result[0])
+    heal_events = log.mask(HEAL)
+    if SelfOnly == 0:
+        heal_events &= ~log.has_flag(SELF)  # Exclude self heals
 
     '''Collect & Calc events'''
-    heal_log = {}
-    for event in heal_events:
-        target = event[2].strip()  # Use target instead of caster
-        heal = int(event[4])
-
-        if target not in heal_log:
-            heal_log[target] = heal
-        else:
-            heal_log[target] += heal
+    return Totals.from_events(log, log.target, heal_events)  # Use target instead of caster
 
-    heal_log = dict(sorted(heal_log.items(), key=lambda x: x[1], reverse=True)[:top_x])  # Sort highest to lowest
+def HealRecLog(logfile, player="", top_x=25, SelfOnly=0, start_time=None, end_time=None):
+    heal_log = HealRecTotals(logfile, SelfOnly, start_time, end_time).finalize(top_x)  # Sort highest to lowest
 
     '''Plot Details'''
     heal_plot = plt.figure(figsize=(12, 8), facecolor='#c1c1c1')
@@ -1,49 +1,40 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, HEAL, SELF
 
 def HealTakenFromLog(logfile, player, includeSelf):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
-    heal_events = []
-    
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            healer, target, ability, heal = result[0][1], result[0][2], result[0][3], int(result[0][4])
-            
-            if target == player:  # Only include healing to specified player
-                if includeSelf == 0:
-                    if healer != target:  # Exclude self-healing
-                        heal_events.append((healer, ability, heal))
-                elif includeSelf == 1:
-                    heal_events.append((healer, ability, heal))
+    heal_events = log.mask(HEAL) & (log.target == log.name_id(player))  # Only include healing to specified player
+    if includeSelf == 0:
+        heal_events &= ~log.has_flag(SELF)  # Exclude self-healing
+    elif includeSelf != 1:
+        heal_events[:] = False
 
     '''Collect & Calc events'''
+    # Keyed by name ids, names are only looked up for the final result
     heal_log = {}  # {healer: total_healing}
-    ability_log = {}  # {healer: {ability: healing}}
+    ability_log = {}  # {(healer, ability): healing}
 
-    for healer, ability, heal in heal_events:
+    for healer, ability, heal in log.columns(heal_events, 'actor', 'ability', 'amount'):
         # Track total healing per healer
-        if healer not in heal_log:
-            heal_log[healer] = heal
-            ability_log[healer] = {}
-        else:
-            heal_log[healer] += heal
-            
+        heal_log[healer] = heal_log.get(healer, 0) + heal
         # Track healing per ability for each healer
-        if ability not in ability_log[healer]:
-            ability_log[healer][ability] = heal
-        else:
-            ability_log[healer][ability] += heal
+        ability_log[healer, ability] = ability_log.get((healer, ability), 0) + heal
 
     # Filter and sort by total healing
     tolerance = sum(heal_log.values()) * 0.01  # 1% tolerance
     heal_log = {k: v for k, v in heal_log.items() if v >= tolerance}
     heal_log = dict(sorted(heal_log.items(), key=lambda x: x[1], reverse=True))
 
+    names = log.names
+    healer_abilities = {healer: {} for healer in heal_log}
+    for (healer, ability), healing in ability_log.items():
+        if healer in healer_abilities:
+            healer_abilities[healer][names[ability]] = healing
+    ability_log = {names[healer]: abilities for healer, abilities in healer_abilities.items()}
+    heal_log = {names[healer]: total for healer, total in heal_log.items()}
+
     '''Plot Details'''
     fig, ax = plt.subplots(figsize=(12, 8), facecolor='#c1c1c1')
     plt.grid(axis='x', zorder=0)
@@ -52,7 +43,7 @@ def HealTakenFromLog(logfile, player, includeSelf):
     ax.set_xlabel('Healing Done', fontsize='x-large')
     ax.set_ylabel('Healer', fontsize='x-large')
     ax.invert_yaxis()  # Show highest healing at top
-    ax.set_title(f'Healing Received by {player} - {logfile} (1% Tolerance Applied)')
+    ax.set_title(f'Healing Received by {player} - {log.path} (1% Tolerance Applied)')
 
     # Add ability breakdown annotations
     for i, (healer, total_healing) in enumerate(heal_log.items()):
@@ -1,32 +1,24 @@
-import re
 import matplotlib.pyplot as plt
+from log_parser import parse_log, HEAL
+from exclusions import BOSS_ENTITIES, NPC_NAMES
 
 def HealReceivedByPlayer(logfile, player, includePvE):
-    with open(logfile, encoding='utf-8') as f:
-        lines = f.readlines()
+    log = parse_log(logfile)
         
     '''Extract Elements'''
-    heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(.+?)\|r targeted (.+?)\|r using \|cff57d6ae(.*?)\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
-    heal_events = []
-
-    excluded_entities = ['Kraken', 'Black Dragon', 'Flame Field', 'Jola the Cursed', 'Glenn', 'Meina', 'Crewman', 'Charybdis']
-
-    for line in lines:
-        if heal_pattern.match(line):
-            result = heal_pattern.findall(line)
-            if result[0][3] not in excluded_entities:
-                if includePvE == 0:
-                    if result[0][2] == player and result[0][1].count(' ') == 0:
-                        heal_events.append(result[0])
-                elif includePvE == 1:
-                    if result[0][2] == player:
-                        heal_events.append(result[0])
+    player_events = log.mask(HEAL) \
+                    & (log.target == log.name_id(player)) \
+                    & ~log.name_lookup(BOSS_ENTITIES)[log.ability]
+    if includePvE == 0:
+        player_events &= ~log.name_lookup(NPC_NAMES)[log.actor]
+
+    heal_events = list(log.events(player_events))
 
     '''Collect & Calc events'''
     heal_log = {}
     for event in heal_events:
-        ability = event[3]
-        heal = int(event[4])
+        ability = event.ability
+        heal = event.amount
 
         if ability in heal_log:
             heal_log[ability] += heal
@@ -17,6 +17,7 @@ from healing_pots import PotsLog
 from mend import parse_heal_log, calculate_heal_stats, plot_total_heals
 from song_buff import plot_song_buff_data
 from song_debuffs import plot_song_debuff_data
+from log_parser import parse_log
 
 # Load token and set up bot
 load_dotenv()
@@ -77,7 +78,9 @@ async def damage_taken(ctx):
     try:
         attachment = ctx.message.attachments[0]
         await attachment.save("temp.log")
-        _, plot = DmgRecLog("temp.log", 25, includePvE=0)
+        # One-shot upload, not worth hashing and saving a sidecar for
+        log = parse_log("temp.log", sidecar=False)
+        _, plot = DmgRecLog(log, 25, includePvE=0)
         buf = io.BytesIO()
         plot.savefig(buf, format='png')
         buf.seek(0)
@@ -0,0 +1,47 @@
+from aggregates import Totals
+from combo_tracker import ComboTracker
+from damage_log import DamageTotals
+from ghosts import GhostAnalyzer, ghost_events
+from healing_log import HealingTotals
+from log_parser import LogTail
+from mend import mend_totals
+
+
+class LiveReport:
+    """Damage, healing, Mend, combo and ghost reports over a log that is still growing.
+
+    Each update() only parses the lines appended since the previous one and
+    adds them to the running totals, so a refresh costs time proportional to
+    the new lines, not to the size of the log.
+    """
+
+    def __init__(self, logfile, includePvE=0, includeSelf=0):
+        self.tail = LogTail(logfile)
+        self.includePvE = includePvE
+        self.includeSelf = includeSelf
+        self.reset()
+
+    def reset(self):
+        self.damage = Totals()
+        self.healing = Totals()
+        self.mend = Totals()
+        self.combos = ComboTracker()
+        self.ghosts = GhostAnalyzer()
+        self.num_events = 0
+
+    def update(self):
+        """Parse and add the newly appended lines, returns the number of new events."""
+        log, restarted = self.tail.poll()
+        if restarted:
+            # The log was truncated or replaced, the new content is parsed from the top
+            self.reset()
+        if not len(log):
+            return 0
+
+        self.damage.merge(DamageTotals(log, self.includePvE))
+        self.healing.merge(HealingTotals(log, self.includeSelf))
+        self.mend.merge(mend_totals(log))
+        self.combos.feed(log)
+        self.ghosts.feed(ghost_events(log))
+        self.num_events += len(log)
+        return len(log)
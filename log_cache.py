@@ -0,0 +1,113 @@
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from event_store import EventStore
+from log_parser import parse_content, content_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUDGET_MB = 512
+DEFAULT_DISK_BUDGET_MB = 2048
+
+
+class ParsedLogCache:
+    """LRU cache of parsed EventStores keyed by the hash of the log content.
+
+    The same upload is only parsed once; switching analyses or options then
+    just re-aggregates the cached event table. Least recently used logs are
+    evicted once their combined size exceeds the memory budget.
+
+    With a sidecar_dir, parsed logs are also saved there by content hash and
+    memory-mapped back instead of re-parsed, e.g. after a server restart.
+    The least recently used saved logs are deleted once the directory holds
+    more than max_disk_bytes. With several workers, large logs are parsed in
+    a process pool.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_BUDGET_MB * 1024 * 1024, sidecar_dir=None, workers=1,
+                 max_disk_bytes=DEFAULT_DISK_BUDGET_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.sidecar_dir = sidecar_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.workers = workers
+        self.entries = OrderedDict()  # {hash: EventStore}
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+
+    def get(self, content, name):
+        """Return the parsed log for the content, parsing it on a cache miss."""
+        key = content_hash(content)
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        log = self._load_or_parse(key, content, name)
+
+        with self.lock:
+            if key not in self.entries:
+                self.entries[key] = log
+                self.total_bytes += log.nbytes
+                self._evict()
+            return self.entries.get(key, log)
+
+    def _load_or_parse(self, key, content, name):
+        if not self.sidecar_dir:
+            return parse_content(content, name, self.workers)
+
+        base_path = os.path.join(self.sidecar_dir, key)
+        loaded = EventStore.load(base_path)
+        if loaded is not None and loaded[1].get('source_hash') == key:
+            log = loaded[0]
+            log.path = name
+            # Mark it recently used, so disk eviction goes by last use rather than first parse
+            try:
+                os.utime(base_path + '.json')
+            except OSError:
+                pass
+            return log
+
+        log = parse_content(content, name, self.workers)
+        try:
+            os.makedirs(self.sidecar_dir, exist_ok=True)
+            log.save(base_path, source_hash=key, source_size=len(content))
+            self._evict_disk(key)
+        except OSError as e:
+            logger.warning(f"Could not save parsed events for {name}: {e}")
+        return log
+
+    def _evict_disk(self, keep):
+        # {hash: (last use, bytes)} of the saved logs, the .json is touched on every use
+        saved = {}
+        for entry in os.scandir(self.sidecar_dir):
+            key, suffix = os.path.splitext(entry.name)
+            if suffix in ('.npy', '.json') and entry.is_file():
+                stat = entry.stat()
+                last_use, size = saved.get(key, (0, 0))
+                last_use = max(last_use, stat.st_mtime) if suffix == '.json' else last_use
+                saved[key] = (last_use, size + stat.st_size)
+
+        total = sum(size for _, size in saved.values())
+        # Always keep the newest entry, even if it alone exceeds the budget
+        for key, (_, size) in sorted(saved.items(), key=lambda item: item[1][0]):
+            if total <= self.max_disk_bytes:
+                break
+            if key == keep:
+                continue
+            EventStore.remove_saved(os.path.join(self.sidecar_dir, key))
+            total -= size
+            logger.info(f"Deleted saved parsed log {key} ({size / 1024 / 1024:.1f} MB) from {self.sidecar_dir}")
+
+    def _evict(self):
+        # Always keep the newest entry, even if it alone exceeds the budget
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            key, log = self.entries.popitem(last=False)
+            self.total_bytes -= log.nbytes
+            logger.info(f"Evicted parsed log {log.path} ({log.nbytes / 1024 / 1024:.1f} MB) from cache")
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
@@ -0,0 +1,468 @@
+import hashlib
+import logging
+import mmap
+import numbers
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+from event_store import (
+    Event, EventStore, EventStoreBuilder,
+    DAMAGE, ATTACK, HEAL, BUFF, DEBUFF, CLEARED, CAST, CASTING,
+    CRIT, SELF, PVE
+)
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+# Logs are read in large blocks, lines and events are then produced lazily
+READ_BUFFER_SIZE = 1024 * 1024
+
+# Logs smaller than this are always parsed in-process, a worker pool costs more than it saves
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Parsed events are saved next to the log as <log>.parsed.npy / <log>.parsed.json
+SIDECAR_SUFFIX = '.parsed'
+
+# Every tracked line starts with "<timestamp|ic23895;actor|r", followed by a
+# fixed marker that tells the line type. One literal search for the markers
+# dispatches each line to the pattern of its type, so lines without a marker
+# never run a full pattern. Group names are unique per line type and the last
+# closed group (match.lastgroup) tells the event kind.
+LINE_PREFIX = r'<(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\|ic23895;(?P<actor>.+?)\|r'
+LINE_TYPES = [
+    (' attacked ',
+     r' attacked (?P<attack_target>.+?)\|r using \|cff57d6ae(?P<attack_ability>.*?)\|r\|r'
+     r'(?P<damage> and caused \|cffc13d36-(?P<damage_amount>\d+)\|r\|r \|cffc13d36Health\|r\|r \(\|cffc13d36(?P<crit>.+?)\|r\|r\)!)?'),
+    (' targeted ',
+     r' targeted (?P<heal_target>.+?)\|r using \|cff57d6ae(?P<heal_ability>.*?)\|r\|r to restore \|cff9be85a(?P<heal>\d+)\|r\|r health\.'),
+    (' gained the buff: ', r' gained the buff: \|cff57d6ae(?P<buff>.*?)\|r\|r'),
+    (' was struck by a ', r' was struck by a \|cff57d6ae(?P<debuff>.*?)\|r\|r debuff!'),
+    (' debuff cleared', r"'s \|cff57d6ae(?P<cleared>.*?)\|r\|r debuff cleared"),
+    (' successfully cast ', r' successfully cast \|cff57d6ae(?P<cast>.*?)\|r\|r!'),
+    (' is casting ', r' is casting \|cff57d6ae(?P<casting>.*?)\|r\|r!'),
+]
+LINE_MATCHERS = {marker: re.compile(LINE_PREFIX + body).match for marker, body in LINE_TYPES}
+LINE_MARKER = re.compile('|'.join(re.escape(marker) for marker, _ in LINE_TYPES))
+
+# Same patterns on raw bytes, to scan a memory-mapped log without decoding it
+BYTES_LINE_MATCHERS = {marker.encode(): re.compile((LINE_PREFIX + body).encode()).match for marker, body in LINE_TYPES}
+BYTES_LINE_MARKER = re.compile(b'|'.join(re.escape(marker.encode()) for marker, _ in LINE_TYPES))
+
+# Timestamp at the start of a line, to find positions in a log by time
+BYTES_LINE_TIMESTAMP = re.compile(rb'^<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})', re.MULTILINE)
+
+# Event kind of each line type, keyed by its last group
+LINE_KINDS = {
+    'damage': DAMAGE,
+    'attack_ability': ATTACK,
+    'heal': HEAL,
+    'buff': BUFF,
+    'debuff': DEBUFF,
+    'cleared': CLEARED,
+    'cast': CAST,
+    'casting': CASTING,
+}
+
+
+# Many lines share the same second, so decoded timestamps are memoized
+@lru_cache(maxsize=4096)
+def parse_timestamp(timestamp):
+    """Convert a log timestamp ('YYYY-MM-DD HH:MM:SS') to epoch seconds."""
+    # Fixed width format, slicing is much faster than strptime
+    days = date(int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10])).toordinal() - EPOCH_ORDINAL
+    return days * 86400 + int(timestamp[11:13]) * 3600 + int(timestamp[14:16]) * 60 + int(timestamp[17:19])
+
+
+def to_datetime(timestamp):
+    """Convert epoch seconds back to a (naive) datetime."""
+    return EPOCH + timedelta(seconds=timestamp)
+
+
+def to_epoch(value):
+    """Epoch seconds of a time bound given as epoch seconds, a datetime or a log timestamp string (None stays None)."""
+    if value is None:
+        return None
+    # numbers.Real also covers floats and numpy scalars such as log.timestamp[-1]
+    if isinstance(value, numbers.Real) and not isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return int((value - EPOCH).total_seconds())
+    if isinstance(value, (str, bytes)):
+        return parse_timestamp(value)
+    raise ValueError(f"Unsupported time bound {value!r}, expected epoch seconds, a datetime or a log timestamp")
+
+
+def match_line(line):
+    """Match a log line against the pattern of its line type, None for lines we don't track."""
+    marker = LINE_MARKER.search(line)
+    while marker is not None:
+        match = LINE_MATCHERS[marker.group()](line)
+        if match is not None:
+            return match
+        # A marker can also appear inside a name, so keep looking further along the line
+        marker = LINE_MARKER.search(line, marker.end())
+    return None
+
+
+def parse_line(line):
+    """Classify a single log line, returns an Event or None for lines we don't track."""
+    match = match_line(line)
+    if match is None:
+        return None
+
+    group = match.group
+    kind = LINE_KINDS[match.lastgroup]
+    timestamp = parse_timestamp(line[1:20])
+    actor = group('actor').strip()
+    if kind == DAMAGE:
+        return Event(kind, timestamp, actor, group('attack_target').strip(), group('attack_ability'),
+                     int(group('damage_amount')), 'Critical' in group('crit'))
+    if kind == ATTACK:
+        return Event(kind, timestamp, actor, group('attack_target').strip(), group('attack_ability'), 0, False)
+    if kind == HEAL:
+        return Event(kind, timestamp, actor, group('heal_target').strip(), group('heal_ability'), int(group('heal')), False)
+    return Event(kind, timestamp, actor, '', group(match.lastgroup), 0, False)
+
+
+def iter_events(lines):
+    """Lazily classify an iterable of log lines into events."""
+    for line in lines:
+        event = parse_line(line)
+        if event is not None:
+            yield event
+
+
+def iter_buffer_events(buffer, start=0, end=None):
+    """Lazily classify the lines of a raw log buffer (bytes or mmap) into events.
+
+    Only lines containing a line type marker are looked at, and only the
+    captured groups of a matching line are decoded. start and end limit the
+    scan to a byte range, they must lie on line boundaries.
+    """
+    if end is None:
+        end = len(buffer)
+    pos = start
+    while (marker := BYTES_LINE_MARKER.search(buffer, pos, end)) is not None:
+        line_start = buffer.rfind(b'\n', start, marker.start()) + 1 or start
+        line_end = buffer.find(b'\n', marker.end(), end)
+        if line_end == -1:
+            line_end = end
+        match = BYTES_LINE_MATCHERS[marker.group()](buffer, line_start, line_end)
+        if match is None:
+            # A marker can also appear inside a name, so keep looking further along the line
+            pos = marker.end()
+            continue
+
+        yield bytes_match_to_event(match)
+        pos = line_end + 1
+
+
+# Names repeat on almost every line, so decoded names are memoized
+decode_name = lru_cache(maxsize=65536)(lambda value: value.decode('utf-8'))
+
+
+def bytes_match_to_event(match):
+    """Build the Event of a raw line matched by one of the bytes patterns, decoding only the captured fields."""
+    group = match.group
+    kind = LINE_KINDS[match.lastgroup]
+    # int() accepts ASCII digits as bytes, so the timestamp needs no decoding
+    timestamp = parse_timestamp(group('timestamp'))
+    actor = decode_name(group('actor')).strip()
+    if kind == DAMAGE:
+        return Event(kind, timestamp, actor, decode_name(group('attack_target')).strip(), decode_name(group('attack_ability')),
+                     int(group('damage_amount')), b'Critical' in group('crit'))
+    if kind == ATTACK:
+        return Event(kind, timestamp, actor, decode_name(group('attack_target')).strip(), decode_name(group('attack_ability')), 0, False)
+    if kind == HEAL:
+        return Event(kind, timestamp, actor, decode_name(group('heal_target')).strip(), decode_name(group('heal_ability')),
+                     int(group('heal')), False)
+    return Event(kind, timestamp, actor, '', decode_name(group(match.lastgroup)), 0, False)
+
+
+def seek_time(buffer, timestamp, start=0, end=None):
+    """Byte offset of the first line at or after timestamp (epoch seconds) in a raw log buffer.
+
+    Log timestamps only go up, so this is a binary search over byte offsets
+    that looks at a few dozen lines, however long the log is. Lines without
+    a timestamp belong to the timed line after them. start must lie on a line
+    boundary, end is returned if every line is earlier.
+    """
+    if end is None:
+        end = len(buffer)
+    lo, hi = start, end
+    while lo < hi:
+        mid = (lo + hi) // 2
+        line_start = buffer.rfind(b'\n', lo, mid) + 1 or lo
+        match = BYTES_LINE_TIMESTAMP.search(buffer, line_start, hi)
+        if match is None or parse_timestamp(match.group(1)) >= timestamp:
+            hi = line_start
+        else:
+            lo = buffer.find(b'\n', match.end(), hi) + 1 or hi
+    return lo
+
+
+def iter_mmap_events(logfile, start=0, end=None):
+    """Lazily classify a memory-mapped log file into events, without reading it into memory."""
+    with open(logfile, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield from iter_buffer_events(buffer, start, end)
+
+
+def iter_log_lines(logfile):
+    """Lazily read the lines of a log file, without loading the whole file."""
+    with open(logfile, 'r', encoding='utf-8', buffering=READ_BUFFER_SIZE) as f:
+        yield from f
+
+
+def iter_log_events(logfile):
+    """Lazily classify the lines of a log file into events."""
+    return iter_events(iter_log_lines(logfile))
+
+
+def parse_events(events, path):
+    """Collect an iterable of events into an EventStore."""
+    builder = EventStoreBuilder()
+    for event in events:
+        builder.append(event)
+    return builder.build(path)
+
+
+def parse_lines(lines, path):
+    """Classify an iterable of log lines straight into an EventStore."""
+    return parse_events(iter_events(lines), path)
+
+
+def parse_time_range(logfile, start_time=None, end_time=None):
+    """Parse only the events with start_time <= timestamp < end_time (epoch seconds) of a log file.
+
+    Both ends are found with seek_time(), so only the lines inside the
+    window are ever read: the last minutes of a long log cost just those
+    minutes. None leaves that end of the window open.
+    """
+    with open(logfile, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return parse_events((), logfile)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start = 0 if start_time is None else seek_time(buffer, start_time)
+            end = len(buffer) if end_time is None else seek_time(buffer, end_time, start)
+            return parse_events(iter_buffer_events(buffer, start, end), logfile)
+
+
+def line_chunks(buffer, count):
+    """Split a buffer into up to count (start, end) byte ranges on line boundaries."""
+    size = len(buffer)
+    bounds = [0]
+    for i in range(1, count):
+        cut = buffer.find(b'\n', max(size * i // count, bounds[-1]))
+        if cut == -1:
+            break
+        if cut + 1 < size:
+            bounds.append(cut + 1)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _parse_chunk(source, start, end):
+    """Parse one byte range of a log file (path) or raw buffer, runs in a worker process."""
+    if isinstance(source, str):
+        return parse_events(iter_mmap_events(source, start, end), None)
+    return parse_events(iter_buffer_events(source, start, end), None)
+
+
+def parse_parallel(source, path, workers):
+    """Parse a log file (path) or raw buffer in a pool of worker processes.
+
+    The log is split into byte ranges on line boundaries, one per worker,
+    and the parsed chunks are joined back in log order. The result is the
+    same table as a serial parse, so stateful analyses (combos, song
+    uptimes, ghost waves) running over it see one continuous event stream.
+    """
+    if isinstance(source, str):
+        with open(source, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            tasks = [(source, start, end) for start, end in line_chunks(buffer, workers)]
+    else:
+        # Workers only get their own slice of the buffer
+        tasks = [(source[start:end], 0, None) for start, end in line_chunks(source, workers)]
+
+    with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+        chunks = list(pool.map(_parse_chunk, *zip(*tasks)))
+    return EventStore.concat(chunks, path)
+
+
+def parse_content(content, path, workers=1):
+    """Parse the raw bytes of a log (e.g. an upload) into an EventStore.
+
+    Logs of at least PARALLEL_MIN_BYTES are split across worker processes.
+    """
+    if workers > 1 and len(content) >= PARALLEL_MIN_BYTES:
+        return parse_parallel(content, path, workers)
+    # Scanned as bytes, so the upload is never decoded into one big string
+    return parse_events(iter_buffer_events(content), path)
+
+
+def content_hash(content):
+    """Hash of a log's raw bytes."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def file_hash(path, block_size=1024 * 1024):
+    """Hash of a log file's bytes, same value as content_hash() of its content."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_sidecar(logfile, stat):
+    """Load the saved events of a log if they still match the log file, else None."""
+    loaded = EventStore.load(logfile + SIDECAR_SUFFIX)
+    if loaded is None:
+        return None
+
+    log, meta = loaded
+    if meta.get('source_size') != stat.st_size:
+        return None
+    # A touched or copied file keeps its sidecar as long as the content is the same
+    if meta.get('source_mtime_ns') != stat.st_mtime_ns and meta.get('source_hash') != file_hash(logfile):
+        return None
+
+    log.path = logfile
+    return log
+
+
+def save_sidecar(log, logfile, stat):
+    """Save parsed events next to the log, failures only cost a re-parse later."""
+    try:
+        log.save(
+            logfile + SIDECAR_SUFFIX,
+            source_size=stat.st_size,
+            source_mtime_ns=stat.st_mtime_ns,
+            source_hash=file_hash(logfile)
+        )
+    except OSError as e:
+        logger.warning(f"Could not save parsed events for {logfile}: {e}")
+
+
+def source_file(log):
+    """Path of the file a parsed log came from if that file is unchanged on disk, else None.
+
+    Byte offsets into the log are only meaningful for that exact file, not
+    for a file with the same name (e.g. an upload name in the server's cwd).
+    """
+    if log.source is None:
+        return None
+    path, size, mtime_ns = log.source
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+        return None
+    return path
+
+
+def remove_sidecar(logfile):
+    """Delete the saved events of a log, e.g. when the log itself is deleted."""
+    EventStore.remove_saved(logfile + SIDECAR_SUFFIX)
+
+
+class LogTail:
+    """Follows a log file that is still being written, e.g. during a raid.
+
+    Remembers how far the file was parsed, so each poll only parses the
+    complete lines appended since the last one. A trailing partial line is
+    left for the next poll.
+    """
+
+    def __init__(self, logfile):
+        self.logfile = logfile
+        self.offset = 0
+        self.inode = None
+
+    def poll(self):
+        """Parse the newly appended lines.
+
+        Returns (events, restarted): an EventStore of the new events, and
+        whether the file was truncated or replaced so parsing started over
+        from the top (anything built from earlier polls is then stale).
+        """
+        stat = os.stat(self.logfile)
+        restarted = stat.st_size < self.offset or (self.inode is not None and stat.st_ino != self.inode)
+        if restarted:
+            self.offset = 0
+        self.inode = stat.st_ino
+
+        if stat.st_size == self.offset:
+            return parse_events((), self.logfile), restarted
+
+        with open(self.logfile, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            end = buffer.rfind(b'\n', self.offset) + 1
+            if end == 0:
+                # No complete line yet
+                return parse_events((), self.logfile), restarted
+            log = parse_events(iter_buffer_events(buffer, self.offset, end), self.logfile)
+        self.offset = end
+        return log, restarted
+
+
+# Last parsed log, so several reports over the same file share one parse
+_last_parsed = {'key': None, 'log': None}
+
+
+def parse_log(logfile, sidecar=True, use_mmap=True, workers=1, start_time=None, end_time=None):
+    """Parse a log file into a columnar EventStore.
+
+    Accepts either a path or an already parsed log. Parsing the same unchanged
+    file twice in a row returns the cached result instead of re-reading it.
+    With sidecar enabled the events are saved next to the log the first time
+    and memory-mapped back on later runs while the log is unchanged.
+    With use_mmap the log itself is memory-mapped and scanned as bytes,
+    otherwise it is read and decoded line by line. With more than one worker,
+    logs of at least PARALLEL_MIN_BYTES are parsed in a process pool.
+    With start_time / end_time (epoch seconds, datetimes or log timestamp
+    strings) only the events with start_time <= timestamp < end_time are
+    returned. An already parsed log is sliced, otherwise only that part of
+    the file is read and parsed (see parse_time_range).
+    """
+    start_time, end_time = to_epoch(start_time), to_epoch(end_time)
+    windowed = start_time is not None or end_time is not None
+    if isinstance(logfile, EventStore):
+        return logfile.time_slice(start_time, end_time) if windowed else logfile
+
+    stat = os.stat(logfile)
+    key = (os.path.abspath(logfile), stat.st_size, stat.st_mtime_ns)
+    if _last_parsed['key'] == key:
+        return _last_parsed['log'].time_slice(start_time, end_time) if windowed else _last_parsed['log']
+
+    if windowed:
+        log = load_sidecar(logfile, stat) if sidecar else None
+        if log is not None:
+            log.source = key
+            return log.time_slice(start_time, end_time)
+        # A window is not cached or saved, the whole log may never be parsed
+        log = parse_time_range(logfile, start_time, end_time)
+        log.source = key
+        return log
+
+    log = load_sidecar(logfile, stat) if sidecar else None
+    if log is None:
+        if workers > 1 and stat.st_size >= PARALLEL_MIN_BYTES:
+            log = parse_parallel(logfile, logfile, workers)
+        else:
+            events = iter_mmap_events(logfile) if use_mmap else iter_log_events(logfile)
+            log = parse_events(events, logfile)
+        if sidecar:
+            save_sidecar(log, logfile, stat)
+
+    log.source = key
+    _last_parsed['key'] = key
+    _last_parsed['log'] = log
+    return log
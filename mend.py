@@ -1,10 +1,7 @@
-import re
 import os
-from collections import defaultdict
 import matplotlib.pyplot as plt
-
-# Updated regex pattern for the new log format
-heal_pattern = re.compile(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(.*?)\|r targeted (.*?)\|r using \|cff57d6aeMend\|r\|r to restore \|cff9be85a(\d+)\|r\|r health\.')
+from log_parser import parse_log, HEAL
+from aggregates import Totals, RunningStats
 
 # Function to find the log file in the current directory
 def find_log_file(file_name):
@@ -14,38 +11,33 @@ def find_log_file(file_name):
             return os.path.join(current_directory, file)
     raise FileNotFoundError(f"Log file '{file_name}' not found in directory {current_directory}")
 
-# Function to parse the log file and extract healing data
-def parse_heal_log(file_path):
-    heal_data = defaultdict(list)  # Store heals for each healer
-    mend_counts = defaultdict(int)  # Track how many times each player cast "Mend"
-
-    with open(file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            match = heal_pattern.match(line)
-            if match:
-                timestamp, healer, target, heal_amount = match.groups()
-                healer = healer.strip()
-                heal_data[healer].append(int(heal_amount))
-                mend_counts[healer] += 1  # Increment cast count for the healer
-    
+# Function to parse the log file and collect streaming Mend stats per healer (individual heals are not kept)
+def parse_heal_log(file_path, sample_size=0):
+    log = parse_log(file_path)
+    mend_events = log.mask(HEAL) & (log.ability == log.name_id('Mend'))
+    heal_data = RunningStats.from_events(log, log.actor, mend_events, sample_size)  # {healer: RunningStats}
+    mend_counts = {healer: stats.count for healer, stats in heal_data.items()}  # How many times each player cast "Mend"
+
     return heal_data, mend_counts
 
+# Function to collect mergeable Mend totals (e.g. to combine several logs)
+def mend_totals(file_path):
+    log = parse_log(file_path)
+    mend_events = log.mask(HEAL) & (log.ability == log.name_id('Mend'))
+    return Totals.from_events(log, log.actor, mend_events)
+
 # Function to calculate heal stats
 def calculate_heal_stats(heal_data):
     heal_stats = {}
-    for healer, heals in heal_data.items():
-        total_heal_amount = sum(heals)
-        num_casts = len(heals)
-        min_heal = min(heals)
-        max_heal = max(heals)
-        avg_heal = total_heal_amount / num_casts if num_casts > 0 else 0
+    for healer, stats in heal_data.items():
         heal_stats[healer] = {
-            'total_heal_amount': total_heal_amount,
-            'num_casts': num_casts,
-            'min_heal': min_heal,
-            'max_heal': max_heal,
-            'avg_heal': avg_heal,
-            'heals': heals  # Store individual heals for each healer
+            'total_heal_amount': stats.total,
+            'num_casts': stats.count,
+            'min_heal': stats.min,
+            'max_heal': stats.max,
+            'avg_heal': stats.total / stats.count if stats.count > 0 else 0,
+            'std_heal': stats.std,
+            'heals': stats.sample.tolist()  # Sampled individual heals, empty unless parsed with a sample_size
         }
     return heal_stats
 
@@ -86,7 +78,7 @@ def plot_min_max_avg_heals(heal_stats, mend_counts, heal_data, axes, tolerance_r
     if len(other_max_heals) > 1:
         threshold = other_max_heals[1] * 1.25
     else:
-        threshold = max([stats['max_heal'] for stats in heal_stats.values()])  # Fallback to overall max if not enough data
+        threshold = max([stats['max_heal'] for stats in heal_stats.values()], default=0)  # Fallback to overall max if not enough data
 
     for healer, stats in heal_stats.items():
         if mend_counts.get(healer, 0) < tolerance:
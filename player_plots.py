@@ -5,9 +5,12 @@ from healing_by_target import HealAbiLog
 from healing_taken_target import HealReceivedByPlayer
 from damage_taken_from import DmgTakenFromLog
 from healing_taken_from import HealTakenFromLog
+from log_parser import parse_log
 
 def generate_player_plots(logfile, player_name, includePvE, includeSelf):
     """Generate all player-specific plots in one figure"""
+    # Parse the log once, every plot below reuses the same events
+    logfile = parse_log(logfile)
     
     # Create a 3x2 grid of subplots
     fig = plt.figure(figsize=(30, 40))
@@ -1,6 +1,6 @@
 import matplotlib.pyplot as plt
-import re
-from datetime import datetime
+from log_parser import parse_log, BUFF
+from uptime import capped_uptime, UptimeIntervals, plot_timeline
 
 # Constants
 BUFF_TYPES = [
@@ -12,51 +12,21 @@ BUFF_TYPES = [
 BUFF_COLORS = ['#3a5cc3', '#b61233', '#cd8500']
 BUFF_LABELS = ['Bloody Chantey', 'Bulwark Ballad', 'Quickstep']
 
-def parse_buff_data(file_path):
-    buff_data = {}  # {player: {buff_type: duration}}
-    current_buffs = {}  # {player: {buff_type: start_time}}
-    
-    with open(file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            if 'gained the buff:' not in line:
-                continue
-                
-            # Parse timestamp and player
-            timestamp_match = re.match(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(.*?)\|r gained the buff:', line)
-            if not timestamp_match:
-                continue
-                
-            timestamp_str = timestamp_match.group(1)
-            player = timestamp_match.group(2)
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-            
-            # Parse buff name
-            buff_match = re.search(r'\|cff57d6ae(.*?)\|r\|r', line)
-            if not buff_match:
-                continue
-                
-            buff_name = buff_match.group(1).lower()
-            
-            # Only process registered buff types
-            normalized_buff = next((b for b in BUFF_TYPES if b in buff_name.lower()), None)
-            if not normalized_buff:
-                continue
-                
-            # Initialize tracking
-            if player not in current_buffs:
-                current_buffs[player] = {}
-                buff_data[player] = {buff: 0 for buff in BUFF_TYPES}
-                
-            # If buff was already active, add duration
-            if normalized_buff in current_buffs[player]:
-                duration = (timestamp - current_buffs[player][normalized_buff]).total_seconds()
-                if duration > 5:  # Max buff duration
-                    duration = 5
-                buff_data[player][normalized_buff] += duration
-                
-            current_buffs[player][normalized_buff] = timestamp
-            
-    return buff_data
+def parse_buff_data(file_path, buff_types=BUFF_TYPES):
+    # {player: {buff_type: duration}}, each reapplication adds up to 5s (max buff duration)
+    return capped_uptime(parse_log(file_path), BUFF, buff_types, max_duration=5)
+
+def buff_intervals(file_path, buff_types=BUFF_TYPES):
+    # Merged uptime intervals per player and buff, for overlap and time window queries
+    return UptimeIntervals(parse_log(file_path), BUFF, buff_types, duration=5)
+
+def plot_buff_timeline(file_path, ax=None):
+    intervals = buff_intervals(file_path)
+    totals = intervals.totals()
+
+    # Top 20 players by total buff uptime
+    players = sorted(totals, key=lambda player: sum(totals[player].values()), reverse=True)[:20]
+    return plot_timeline(intervals, players, BUFF_COLORS, BUFF_LABELS, 'Song Buff Uptime by Player', ax)
 
 def plot_buff_data(file_path, ax=None):
     buff_data = parse_buff_data(file_path)
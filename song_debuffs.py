@@ -1,6 +1,6 @@
 import matplotlib.pyplot as plt
-import re
-from datetime import datetime
+from log_parser import parse_log, DEBUFF
+from uptime import capped_uptime, UptimeIntervals, plot_timeline
 
 # Constants
 DEBUFF_TYPES = [
@@ -12,51 +12,21 @@ DEBUFF_TYPES = [
 DEBUFF_COLORS = ['#3a5cc3', '#b61233', '#cd8500']
 DEBUFF_LABELS = ['Unguarded', 'Lethargy', 'Unpleasant Sensation']
 
-def parse_debuff_data(file_path):
-    debuff_data = {}  # {player: {debuff_type: duration}}
-    current_debuffs = {}  # {player: {debuff_type: start_time}}
-    
-    with open(file_path, 'r', encoding='utf-8') as file:
-        for line in file:
-            if 'struck by a' not in line or 'debuff!' not in line:
-                continue
-                
-            # Parse timestamp and player
-            timestamp_match = re.match(r'<(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(.*?)\|r was struck', line)
-            if not timestamp_match:
-                continue
-                
-            timestamp_str = timestamp_match.group(1)
-            player = timestamp_match.group(2)
-            timestamp = datetime.strptime(timestamp_str, '%Y-%m-%d %H:%M:%S')
-            
-            # Parse debuff name
-            debuff_match = re.search(r'\|cff57d6ae(.*?)\|r\|r', line)
-            if not debuff_match:
-                continue
-                
-            debuff_name = debuff_match.group(1).lower()
-            
-            # Only process registered debuff types
-            normalized_debuff = next((d for d in DEBUFF_TYPES if d in debuff_name.lower()), None)
-            if not normalized_debuff:
-                continue
-                
-            # Initialize tracking
-            if player not in current_debuffs:
-                current_debuffs[player] = {}
-                debuff_data[player] = {debuff: 0 for debuff in DEBUFF_TYPES}
-                
-            # If debuff was already active, add duration
-            if normalized_debuff in current_debuffs[player]:
-                duration = (timestamp - current_debuffs[player][normalized_debuff]).total_seconds()
-                if duration > 5:  # Max debuff duration
-                    duration = 5
-                debuff_data[player][normalized_debuff] += duration
-                
-            current_debuffs[player][normalized_debuff] = timestamp
-            
-    return debuff_data
+def parse_debuff_data(file_path, debuff_types=DEBUFF_TYPES):
+    # {player: {debuff_type: duration}}, each reapplication adds up to 5s (max debuff duration)
+    return capped_uptime(parse_log(file_path), DEBUFF, debuff_types, max_duration=5)
+
+def debuff_intervals(file_path, debuff_types=DEBUFF_TYPES):
+    # Merged uptime intervals per player and debuff, for overlap and time window queries
+    return UptimeIntervals(parse_log(file_path), DEBUFF, debuff_types, duration=5)
+
+def plot_debuff_timeline(file_path, ax=None):
+    intervals = debuff_intervals(file_path)
+    totals = intervals.totals()
+
+    # Top 20 players by total debuff uptime
+    players = sorted(totals, key=lambda player: sum(totals[player].values()), reverse=True)[:20]
+    return plot_timeline(intervals, players, DEBUFF_COLORS, DEBUFF_LABELS, 'Song Debuff Uptime by Player', ax)
 
 def plot_debuff_data(file_path):
     debuff_data = parse_debuff_data(file_path)
@@ -0,0 +1,32 @@
+"""Builders for synthetic log lines, in the game's log format."""
+
+
+def line(timestamp, actor, body):
+    return f"<{timestamp}|ic23895;{actor}|r{body}"
+
+
+def hit(timestamp, actor, target, amount, ability='Slash'):
+    return line(timestamp, actor,
+                f" attacked {target}|r using |cff57d6ae{ability}|r|r and caused |cffc13d36-{amount}|r|r "
+                f"|cffc13d36Health|r|r (|cffc13d36Normal|r|r)!")
+
+
+def casting(timestamp, actor, spell):
+    return line(timestamp, actor, f" is casting |cff57d6ae{spell}|r|r!")
+
+
+def debuff(timestamp, actor, name):
+    return line(timestamp, actor, f" was struck by a |cff57d6ae{name}|r|r debuff!")
+
+
+def cleared(timestamp, actor, name):
+    return line(timestamp, actor, f"'s |cff57d6ae{name}|r|r debuff cleared")
+
+
+def buff(timestamp, actor, name):
+    return line(timestamp, actor, f" gained the buff: |cff57d6ae{name}|r|r.")
+
+
+def write_log(path, lines):
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return str(path)
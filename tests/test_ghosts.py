@@ -0,0 +1,29 @@
+from ghost_history import GhostHistory
+from ghosts import GhostAnalyzer
+from log_lines import casting, hit, write_log
+
+SPAWN_ONLY = [
+    hit('2024-05-01 20:00:00', 'Alice', 'Black Dragon', 500),
+    casting('2024-05-01 20:00:01', 'Black Dragon', 'Penetrating Dark Energy'),
+    hit('2024-05-01 20:00:02', 'Black Dragon', 'Alice', 300),
+]
+
+
+def test_report_of_spawn_without_debuffs(tmp_path):
+    report = GhostAnalyzer().analyze_events([])
+    assert not report['success']
+
+    report = GhostAnalyzer().stream_log_analysis(write_log(tmp_path / 'spawn.log', SPAWN_ONLY))
+    assert report['success']
+    assert report['total_waves'] == 1
+    assert report['player_stats'].empty
+    assert 'Clear Rate' in report['player_stats'].columns
+
+
+def test_history_keeps_spawn_only_encounter(tmp_path):
+    history = GhostHistory()
+    assert history.add_logs([write_log(tmp_path / 'spawn.log', SPAWN_ONLY)]) == 1
+    assert len(history.pulls) == 1
+    assert history.pulls[0]['waves'] == 1
+    assert len(history) == 0
+    assert history.player_summary().empty
@@ -0,0 +1,27 @@
+from live_report import LiveReport
+from log_lines import casting, cleared, debuff, hit, write_log
+
+
+def test_ghost_report_between_spawn_and_first_debuff(tmp_path):
+    path = tmp_path / 'live.log'
+    write_log(path, [
+        hit('2024-05-01 20:00:00', 'Alice', 'Black Dragon', 500),
+        casting('2024-05-01 20:00:01', 'Black Dragon', 'Penetrating Dark Energy'),
+    ])
+    report = LiveReport(str(path))
+    assert report.update() == 2
+
+    # Polled after the spawn, before anyone was hit
+    ghosts = report.ghosts.report()
+    assert ghosts['success']
+    assert ghosts['player_stats'].empty
+    assert ghosts['wave_summary']['Players Hit'].tolist() == [0]
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(debuff('2024-05-01 20:00:03', 'Alice', 'Penetrating Dark Energy') + '\n')
+        f.write(cleared('2024-05-01 20:00:07', 'Alice', 'Penetrating Dark Energy') + '\n')
+    assert report.update() == 2
+
+    ghosts = report.ghosts.report()
+    assert ghosts['player_stats']['Player'].tolist() == ['Alice']
+    assert ghosts['wave_summary']['Cleared'].tolist() == [1]
@@ -0,0 +1,22 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from log_parser import parse_log
+from mend import parse_heal_log, calculate_heal_stats, plot_min_max_avg_heals, plot_mend_casts, plot_total_heals
+from log_lines import hit, write_log
+
+
+def test_mend_plots_without_heals(tmp_path):
+    # e.g. an encounter or time window in which nobody cast Mend
+    log = parse_log(write_log(tmp_path / 'no_heals.log', [hit('2024-05-01 20:00:00', 'Alice', 'Bob', 100)]),
+                    sidecar=False)
+    heal_data, mend_counts = parse_heal_log(log)
+    heal_stats = calculate_heal_stats(heal_data)
+    assert heal_stats == {}
+
+    fig, axes = plt.subplots(1, 3)
+    plot_total_heals(heal_stats, axes[0])
+    plot_min_max_avg_heals(heal_stats, mend_counts, heal_data, axes[1])
+    plot_mend_casts(mend_counts, axes[2])
+    plt.close('all')
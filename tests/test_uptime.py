@@ -0,0 +1,43 @@
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from log_parser import parse_log, BUFF
+from song_buff import parse_buff_data
+from uptime import capped_uptime, plot_timeline, UptimeIntervals
+from log_lines import buff, write_log
+
+LOG = [
+    buff('2024-05-01 20:00:00', 'Alice', 'Bloody Chantey (Rank 2)'),
+    buff('2024-05-01 20:00:03', 'Alice', 'Bloody Chantey (Rank 2)'),
+    buff('2024-05-01 20:00:10', 'Alice', 'Bloody Chantey (Rank 2)'),
+    buff('2024-05-01 20:00:01', 'Bob', 'Quickstep (Rank 5)'),
+    buff('2024-05-01 20:00:02', 'Bob', 'Quickstep (Rank 5)'),
+]
+
+
+def test_capped_uptime_ignores_effect_case(tmp_path):
+    log = parse_log(write_log(tmp_path / 'buffs.log', LOG), sidecar=False)
+    # 3s until the reapplication, then capped at 5s
+    for effects in (['bloody chantey (rank 2)'], ['Bloody Chantey (Rank 2)'], ['BLOODY CHANTEY']):
+        assert capped_uptime(log, BUFF, effects) == {'Alice': {effects[0]: 8}}
+
+    uptime = parse_buff_data(log, ['Bloody Chantey (Rank 2)', 'Quickstep (Rank 5)'])
+    assert uptime['Alice']['Bloody Chantey (Rank 2)'] == 8
+    assert uptime['Bob']['Quickstep (Rank 5)'] == 1
+
+
+def test_uptime_intervals_ignore_effect_case(tmp_path):
+    log = parse_log(write_log(tmp_path / 'buffs.log', LOG), sidecar=False)
+    effects = ['Bloody Chantey (Rank 2)', 'Quickstep (Rank 5)']
+    intervals = UptimeIntervals(log, BUFF, effects)
+
+    # 20:00:00 + 5s extended by the reapplication at 20:00:03, then 20:00:10 on its own
+    starts, ends = intervals.get('Alice', effects[0])
+    assert (ends - starts).tolist() == [8, 5]
+    assert intervals.totals() == {'Alice': {effects[0]: 13, effects[1]: 0}, 'Bob': {effects[0]: 0, effects[1]: 6}}
+
+    fig = plot_timeline(intervals, intervals.players, ['red', 'blue'], ['Chantey', 'Quickstep'], 'Uptime')
+    # One broken bar per (player, effect) with uptime
+    assert len(fig.axes[0].collections) == 2
+    plt.close('all')
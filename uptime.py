@@ -0,0 +1,207 @@
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.ticker import FuncFormatter
+from log_parser import to_datetime
+
+
+def effect_lookup(log, effects):
+    """Index into effects for every name in the string table, -1 for other names.
+
+    A name matches the first effect it contains, ignoring case.
+    """
+    effects = [effect.lower() for effect in effects]
+    lookup = np.full(len(log.names), -1, dtype=np.int64)
+    for i, name in enumerate(log.names):
+        name = name.lower()
+        for j, effect in enumerate(effects):
+            if effect in name:
+                lookup[i] = j
+                break
+    return lookup
+
+
+def capped_uptime(log, kind, effects, max_duration=5):
+    """Uptime per player and effect from the application events of one kind.
+
+    Each application after the first counts the time since the previous one
+    of the same effect on the same player, capped at max_duration seconds.
+    Returns {player: {effect: seconds}} in order of each player's first
+    application, with every effect listed.
+    """
+    lookup = effect_lookup(log, effects)
+    rows = log.mask(kind)
+    rows &= lookup[log.ability] >= 0
+    players = log.actor[rows]
+    if not len(players):
+        return {}
+
+    # Group applications per (player, effect), in log order within each group
+    keys = players.astype(np.int64) * len(effects) + lookup[log.ability[rows]]
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    timestamps = log.timestamp[rows][order]
+
+    same = keys[1:] == keys[:-1]
+    durations = np.minimum(np.diff(timestamps), max_duration)[same]
+    unique_keys, inverse = np.unique(keys[1:][same], return_inverse=True)
+    totals = np.bincount(inverse, weights=durations, minlength=len(unique_keys))
+
+    unique_players, first_seen = np.unique(players, return_index=True)
+    uptime = {
+        log.names[player]: {effect: 0 for effect in effects}
+        for player in unique_players[np.argsort(first_seen, kind='stable')].tolist()
+    }
+    for key, total in zip(unique_keys.tolist(), totals.tolist()):
+        player, effect = divmod(key, len(effects))
+        uptime[log.names[player]][effects[effect]] = int(total)
+    return uptime
+
+
+def merge_intervals(starts, ends):
+    """Union of intervals sorted by start, as sorted, non-overlapping (starts, ends) arrays."""
+    if not len(starts):
+        return starts, ends
+    reach = np.maximum.accumulate(ends)
+    new = np.empty(len(starts), dtype=bool)
+    new[0] = True
+    new[1:] = starts[1:] > reach[:-1]
+    last = np.append(np.flatnonzero(new)[1:] - 1, len(starts) - 1)
+    return starts[new], reach[last]
+
+
+def covered(interval_sets, need):
+    """Intervals covered by at least need of the given (starts, ends) interval sets.
+
+    need=1 is the union, need=len(interval_sets) the intersection.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if not interval_sets or need > len(interval_sets):
+        return empty, empty
+    times = np.concatenate([part for starts, ends in interval_sets for part in (starts, ends)])
+    deltas = np.concatenate([part for starts, ends in interval_sets
+                             for part in (np.ones(len(starts), dtype=np.int64), -np.ones(len(ends), dtype=np.int64))])
+    if not len(times):
+        return empty, empty
+    # Interval ends sort before starts at the same time, touching intervals do not overlap
+    order = np.lexsort((deltas, times))
+    times = times[order]
+    depth = np.cumsum(deltas[order])
+    inside = (depth[:-1] >= need) & (times[1:] > times[:-1])
+    return merge_intervals(times[:-1][inside], times[1:][inside])
+
+
+def clip_intervals(intervals, window):
+    """Parts of the intervals inside the (start, end) window, None for no window."""
+    if window is None:
+        return intervals
+    starts, ends = intervals
+    starts = np.maximum(starts, window[0])
+    ends = np.minimum(ends, window[1])
+    inside = ends > starts
+    return starts[inside], ends[inside]
+
+
+def total_time(intervals):
+    starts, ends = intervals
+    return int((ends - starts).sum())
+
+
+class UptimeIntervals:
+    """Merged uptime intervals per (player, effect), built once from a parsed log.
+
+    Every application of an effect keeps it up for duration seconds, a
+    reapplication while it is up extends it. Unlike capped_uptime() this
+    knows when an effect was up, so uptimes can be combined across effects
+    and players and restricted to a time window (epoch seconds, e.g. a boss
+    phase) without going back to the log.
+    """
+
+    def __init__(self, log, kind, effects, duration=5):
+        self.effects = list(effects)
+        self.duration = duration
+        self.intervals = {}  # {(player, effect): (starts, ends)}
+        self.players = []    # in order of first application
+
+        lookup = effect_lookup(log, self.effects)
+        rows = log.mask(kind)
+        rows &= lookup[log.ability] >= 0
+        players = log.actor[rows]
+        if not len(players):
+            return
+
+        keys = players.astype(np.int64) * len(self.effects) + lookup[log.ability[rows]]
+        timestamps = log.timestamp[rows]
+        order = np.lexsort((timestamps, keys))
+        keys = keys[order]
+        starts = timestamps[order]
+        ends = starts + duration
+
+        # A new interval starts at every new key or when the effect had run out
+        new = np.empty(len(keys), dtype=bool)
+        new[0] = True
+        new[1:] = (keys[1:] != keys[:-1]) | (starts[1:] > ends[:-1])
+        first = np.flatnonzero(new)
+        last = np.append(first[1:] - 1, len(keys) - 1)
+        interval_keys, interval_starts, interval_ends = keys[first], starts[first], ends[last]
+
+        unique_keys, bounds = np.unique(interval_keys, return_index=True)
+        bounds = np.append(bounds, len(interval_keys))
+        for i, key in enumerate(unique_keys.tolist()):
+            player, effect = divmod(key, len(self.effects))
+            part = slice(bounds[i], bounds[i + 1])
+            self.intervals[log.names[player], self.effects[effect]] = (interval_starts[part], interval_ends[part])
+
+        unique_players, first_seen = np.unique(players, return_index=True)
+        self.players = [log.names[player] for player in unique_players[np.argsort(first_seen, kind='stable')].tolist()]
+
+    def get(self, player, effect, window=None):
+        """(starts, ends) arrays of the times the player had the effect."""
+        empty = np.empty(0, dtype=np.int64)
+        return clip_intervals(self.intervals.get((player, effect), (empty, empty)), window)
+
+    def union(self, keys, window=None):
+        """Times at least one of the (player, effect) keys was up."""
+        return covered([self.get(player, effect, window) for player, effect in keys], 1)
+
+    def intersection(self, keys, window=None):
+        """Times all of the (player, effect) keys were up at once."""
+        return covered([self.get(player, effect, window) for player, effect in keys], len(keys))
+
+    def uptime(self, player, effect, window=None):
+        return total_time(self.get(player, effect, window))
+
+    def all_at_once(self, player, effects=None, window=None):
+        """Seconds the player had all of the effects (default: all tracked) up at once."""
+        return total_time(self.intersection([(player, effect) for effect in (effects or self.effects)], window))
+
+    def totals(self, window=None):
+        """{player: {effect: seconds}} like capped_uptime(), from the merged intervals."""
+        return {player: {effect: self.uptime(player, effect, window) for effect in self.effects}
+                for player in self.players}
+
+
+def plot_timeline(intervals, players, colors, labels, title, ax=None):
+    """Uptime of each effect per player over time, one broken bar per (player, effect)."""
+    if ax is None:
+        fig, ax = plt.subplots(figsize=(15, max(4, len(players) * 0.6)))
+    bar_height = 0.8 / len(intervals.effects)
+    labelled = set()
+
+    for i, player in enumerate(players):
+        for j, (effect, color) in enumerate(zip(intervals.effects, colors)):
+            starts, ends = intervals.get(player, effect)
+            if len(starts):
+                ax.broken_barh(list(zip(starts.tolist(), (ends - starts).tolist())),
+                               (i + j * bar_height - 0.4, bar_height), color=color,
+                               label=labels[j] if j not in labelled else "")
+                labelled.add(j)
+
+    ax.set_yticks(range(len(players)))
+    ax.set_yticklabels(players)
+    ax.invert_yaxis()
+    ax.set_xlabel('Time')
+    ax.set_title(title)
+    ax.xaxis.set_major_formatter(FuncFormatter(lambda x, pos: to_datetime(x).strftime('%H:%M:%S')))
+    ax.legend(loc='upper right')
+    ax.grid(axis='x', alpha=0.3)
+    return ax.figure